@@ -1,4 +1,9 @@
+import heapq
+import mmap
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Test data for demonstration
 test_text = """
@@ -13,74 +18,336 @@ What about this one?'
 Not a question.
 """
 
+# The six Q1 patterns as written for the homework
+ORIGINAL_PATTERNS = {
+    # 1. U.S. ZIP codes (disjunction + token boundaries)
+    "zip_codes": re.compile(r'\b\d{5}(?:[-\s]\d{4})?\b'),
+    # 2. Words that do NOT start with capital letter
+    "non_capital_words": re.compile(r"\b[^A-Z\s][^\s]*(?:['-][^\s]+)*\b"),
+    # 3. Numbers with optional features
+    "numbers": re.compile(r'[+-]?(?:\d{1,3}(?:,\d{3})*|\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?'),
+    # 4. Email spelling variants (case-insensitive)
+    "email_variants": re.compile(r'\be[-\s–]?mail\b', re.IGNORECASE),
+    # 5. "go" interjection with optional punctuation
+    "go_interjections": re.compile(r'\bgo+\b[!.,?]?', re.IGNORECASE),
+    # 6. Lines ending with question marks (possibly with quotes/brackets), applied to
+    #    each line of the text with re.match
+    "question_lines": re.compile(r'.*\?[\s"\')\]]*$'),
+}
+
+# Linear-time forms with the same matches (checked by fuzz_regex.py):
+# - non-capital words: ['-][^\s]+ only re-matches what [^\s]* already covers, and the nested
+#   quantifiers backtrack exponentially on runs like "a-----!" before settling on the
+#   longest end at a word boundary, which [^\s]*\b finds directly
+# - go interjections: giving back an 'o' can never create the \b, so o++ is possessive
+# - question lines: one multiline scan over the whole text instead of re.match per line, with
+#   \s narrowed to [^\S\n] so a match stays on its line; the trailing run cannot contain a
+#   newline, so giving it back never helps $
+LINEAR_REWRITES = {
+    "non_capital_words": re.compile(r"\b[^A-Z\s][^\s]*\b"),
+    "go_interjections": re.compile(r'\bgo++\b[!.,?]?', re.IGNORECASE),
+    "question_lines": re.compile(r'^.*\?(?:[^\S\n]|["\')\]])*+$', re.MULTILINE),
+}
+
+# Registry used by every extractor below, compiled once at import
+PATTERNS = {**ORIGINAL_PATTERNS, **LINEAR_REWRITES}
+
+PATTERN_LABELS = {
+    "zip_codes": "ZIP codes",
+    "non_capital_words": "Non-capital words",
+    "numbers": "Numbers",
+    "email_variants": "Email variants",
+    "go_interjections": "Go interjections",
+    "question_lines": "Question lines",
+}
+
+class PatternStats:
+    """Per-pattern counters: calls, text scanned, matches produced and cumulative time
+    
+    str scans (PATTERNS) add to chars and byte scans (BYTE_PATTERNS) to bytes, so the two
+    units never mix in one counter.
+    """
+    
+    FIELDS = ("calls", "chars", "bytes", "matches", "time_ns")
+    
+    def __init__(self):
+        self.counters = {}
+    
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = dict.fromkeys(self.FIELDS, 0)
+        return counter
+    
+    def record(self, name, matches, elapsed_ns, chars=0, nbytes=0):
+        counter = self.counter(name)
+        counter["calls"] += 1
+        counter["chars"] += chars
+        counter["bytes"] += nbytes
+        counter["matches"] += matches
+        counter["time_ns"] += elapsed_ns
+    
+    def merge(self, snapshot):
+        """Add the counters of another PatternStats' snapshot (e.g. from a worker process)"""
+        for name, other in snapshot.items():
+            counter = self.counter(name)
+            for field in self.FIELDS:
+                counter[field] += other[field]
+    
+    def snapshot(self):
+        """Copy of the counters, {name: {"calls", "chars", "bytes", "matches", "time_ns"}}"""
+        return {name: dict(counter) for name, counter in self.counters.items()}
+    
+    def reset(self):
+        self.counters.clear()
+
+def find_matches(name, text, stats=None):
+    """One registered pattern over text as [(match, (start, end)), ...], recorded in stats if given"""
+    start = time.perf_counter_ns()
+    matches = [(match.group(), match.span()) for match in PATTERNS[name].finditer(text)]
+    if stats is not None:
+        stats.record(name, len(matches), time.perf_counter_ns() - start, chars=len(text))
+    return matches
+
+def extract_all(text, stats=None):
+    """Run every registered pattern over text; returns {name: [(match, (start, end)), ...]}
+    
+    Each pattern gets its own finditer scan: a single alternation over the patterns that
+    cannot overlap measured slower than scanning them separately. With stats (a
+    PatternStats) every scan is recorded under its pattern's name.
+    """
+    return {name: find_matches(name, text, stats) for name in PATTERNS}
+
+# Bytes versions of the registry for scanning raw file buffers. Matching is ASCII-only
+# (\d, \s, \b and IGNORECASE see bytes), so on non-ASCII text they can differ from PATTERNS.
+# The en dash is three bytes in UTF-8, so it cannot sit inside a byte character class.
+BYTE_SOURCES = {"email_variants": rb'\be(?:[-\s]|\xe2\x80\x93)?mail\b'}
+BYTE_PATTERNS = {name: re.compile(BYTE_SOURCES.get(name, pattern.pattern.encode()), pattern.flags & ~re.UNICODE)
+                 for name, pattern in PATTERNS.items()}
+
+# Bytes (characters for str input) past a chunk's last newline that are kept as lookahead. Matches only run past a
+# line end for ZIP codes and email variants ("12345\n6789", "e\nmail"), by a few bytes.
+WINDOW_OVERLAP = 4096
+
+# Smallest overlap that still gives exact results: the four characters a ZIP+4 or email match
+# can run past a newline ("6789", "mail"), plus one for the closing \b to see the next character
+MIN_OVERLAP = 5
+
+def check_overlap(overlap):
+    if overlap < MIN_OVERLAP:
+        raise ValueError(f"overlap must be at least {MIN_OVERLAP} characters, got {overlap}")
+
+def scan_buffer(buf, name, pos=0, endpos=None, stats=None):
+    """Lazily yield (name, span, match) for one byte pattern over a buffer
+    
+    With stats, only the time spent inside the regex engine is recorded (not the consumer's
+    time between records), once the scan finishes or the generator is closed.
+    """
+    endpos = len(buf) if endpos is None else endpos
+    matches = BYTE_PATTERNS[name].finditer(buf, pos, endpos)
+    if stats is None:
+        for match in matches:
+            yield name, match.span(), match.group()
+        return
+    
+    found = 0
+    elapsed = 0
+    try:
+        while True:
+            start = time.perf_counter_ns()
+            match = next(matches, None)
+            elapsed += time.perf_counter_ns() - start
+            if match is None:
+                break
+            found += 1
+            yield name, match.span(), match.group()
+    finally:
+        stats.record(name, found, elapsed, nbytes=endpos - pos)
+
+def scan_windows(f, size, names, window_size, overlap, stats=None):
+    """Map the file one window at a time; each window's own region ends on a line boundary"""
+    granularity = mmap.ALLOCATIONGRANULARITY
+    resume = dict.fromkeys(names, 0)  # where each pattern's next search starts (file offset)
+    start = 0
+    while start < size:
+        base = start - start % granularity  # mmap offsets must be aligned
+        end = min(size, start + window_size + overlap)
+        with mmap.mmap(f.fileno(), end - base, access=mmap.ACCESS_READ, offset=base) as buf:
+            if start + window_size >= size:
+                cut = size
+            else:
+                newline = buf.rfind(b'\n', start - base, start + window_size - base)
+                if newline < 0:
+                    # A single line longer than the window: grow the window until it holds one
+                    window_size *= 2
+                    continue
+                cut = base + newline + 1
+            
+            # A match belongs to this window if it starts before the cut; the scan past the
+            # cut only serves as lookahead, and the next window picks up from resume
+            found = []
+            for name in names:
+                hits = []
+                scan = scan_buffer(buf, name, resume[name] - base, min(size, cut + overlap) - base, stats)
+                for _, (s, e), match in scan:
+                    if s + base >= cut:
+                        break
+                    hits.append((name, (s + base, e + base), match))
+                    resume[name] = e + base
+                scan.close()  # records stats before the window is unmapped
+                resume[name] = max(resume[name], cut)
+                found.append(hits)
+            yield from heapq.merge(*found, key=lambda record: record[1][0])
+        start = cut
+
+def iter_file_matches(path, names=None, window_size=None, overlap=WINDOW_OVERLAP, stats=None):
+    """Stream (name, (start, end), match) records for the registered patterns over a file
+    
+    Records come in document order (ties in registry order), with byte offsets and bytes
+    matches from BYTE_PATTERNS run directly over an mmap of the file, so memory use does not
+    grow with file size. By default the whole file is mapped; window_size (bytes) maps it a
+    window at a time instead, for files too big for the address space, with the same output.
+    overlap (at least MIN_OVERLAP) is the lookahead each window keeps past its last newline.
+    With stats (a PatternStats) every buffer scan is recorded under its pattern, in bytes.
+    """
+    check_overlap(overlap)
+    names = list(names or BYTE_PATTERNS)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        if window_size is not None:
+            yield from scan_windows(f, size, names, window_size, overlap, stats)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield from heapq.merge(*(scan_buffer(buf, name, stats=stats) for name in names),
+                                   key=lambda record: record[1][0])
+
+def split_lines(text, chunk_size):
+    """(start, cut) chunks of roughly chunk_size characters, each cut just after a newline"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        cut = len(text)
+        if start + chunk_size < len(text):
+            # Last newline inside the chunk, or the next one if a single line is longer
+            newline = text.rfind('\n', start, start + chunk_size)
+            if newline < 0:
+                newline = text.find('\n', start + chunk_size)
+            if newline >= 0:
+                cut = newline + 1
+        chunks.append((start, cut))
+        start = cut
+    return chunks
+
+def extract_chunk(chunk, offset, cut, profile=False):
+    """Worker side of extract_all_parallel: matches starting before cut, in file offsets,
+    and the chunk's PatternStats snapshot when profiling (else None)"""
+    stats = PatternStats() if profile else None
+    results = {}
+    for name, matches in extract_all(chunk, stats).items():
+        results[name] = [(match, (s + offset, e + offset)) for match, (s, e) in matches if s + offset < cut]
+    return results, stats.snapshot() if profile else None
+
+def extract_all_parallel(text, n_jobs=None, chunk_size=1 << 20, overlap=WINDOW_OVERLAP, stats=None):
+    """extract_all(text) split into line-aligned chunks scanned across a process pool
+    
+    Each chunk is scanned with overlap (at least MIN_OVERLAP) characters of lookahead past
+    its cut and keeps the matches that start before the cut; results are stitched back in
+    document order. When a match runs over a cut, the next chunk is rescanned serially from
+    the match end until it falls back in step with the worker's matches, so the output
+    equals extract_all. With stats, the workers' scans and the rescans are all recorded.
+    """
+    check_overlap(overlap)
+    chunks = split_lines(text, chunk_size)
+    args = [(text[start:min(len(text), cut + overlap)], start, cut, stats is not None) for start, cut in chunks]
+    
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(chunks) <= 1:
+        parts = [extract_chunk(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(extract_chunk, *zip(*args)))
+    if stats is not None:
+        for _, snapshot in parts:
+            stats.merge(snapshot)
+    
+    results = {}
+    for name, pattern in PATTERNS.items():
+        merged = []
+        last_end = 0
+        for (start, cut), (part, _) in zip(chunks, parts):
+            hits = part[name]
+            if last_end > start:
+                # The previous chunk's last match crossed the cut: replay the serial scan
+                # from its end until it reproduces one of this chunk's matches
+                index = {span: i for i, (_, span) in enumerate(hits)}
+                resynced = []
+                rescan_start = time.perf_counter_ns()
+                found = 0
+                # Same lookahead as the worker had, so a match running past the cut ends the same way
+                endpos = min(len(text), cut + overlap)
+                scan_from = last_end
+                for match in pattern.finditer(text, last_end, endpos):
+                    if match.start() >= cut:
+                        break
+                    if match.span() in index:
+                        resynced = hits[index[match.span()]:]
+                        break
+                    merged.append((match.group(), match.span()))
+                    last_end = match.end()
+                    found += 1
+                if stats is not None:
+                    stats.record(name, found, time.perf_counter_ns() - rescan_start, chars=endpos - scan_from)
+                hits = resynced
+            merged.extend(hits)
+            if hits:
+                last_end = hits[-1][1][1]
+        results[name] = merged
+    return results
+
 def test_regex_patterns():
     """Test all 6 regex patterns with sample data."""
+    results = extract_all(test_text)
     
-    # 1. U.S. ZIP codes (disjunction + token boundaries)
-    zip_pattern = r'\b\d{5}(?:[-\s]\d{4})?\b'
     print("1. ZIP CODES:")
-    zip_matches = re.findall(zip_pattern, test_text)
-    for match in zip_matches:
+    for match, _ in results["zip_codes"]:
         print(f"   Found: {match}")
     print()
     
-    # 2. Words that do NOT start with capital letter
-    non_capital_pattern = r"\b[^A-Z\s][^\s]*(?:['-][^\s]+)*\b"
     print("2. NON-CAPITAL WORDS:")
-    non_capital_matches = re.findall(non_capital_pattern, test_text)
-    for match in non_capital_matches[:10]:  # Show first 10
+    non_capital_matches = results["non_capital_words"]
+    for match, _ in non_capital_matches[:10]:  # Show first 10
         print(f"   Found: {match}")
     print(f"   ... and {len(non_capital_matches) - 10} more")
     print()
     
-    # 3. Numbers with optional features
-    number_pattern = r'[+-]?(?:\d{1,3}(?:,\d{3})*|\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?'
     print("3. NUMBERS:")
-    number_matches = re.findall(number_pattern, test_text)
-    for match in number_matches:
+    for match, _ in results["numbers"]:
         print(f"   Found: {match}")
     print()
     
-    # 4. Email spelling variants (case-insensitive)
-    email_pattern = r'\be[-\s–]?mail\b'
     print("4. EMAIL VARIANTS:")
-    email_matches = re.findall(email_pattern, test_text, re.IGNORECASE)
-    for match in email_matches:
+    for match, _ in results["email_variants"]:
         print(f"   Found: {match}")
     print()
     
-    # 5. "go" interjection with optional punctuation
-    go_pattern = r'\bgo+\b[!.,?]?'
     print("5. GO INTERJECTIONS:")
-    go_matches = re.findall(go_pattern, test_text, re.IGNORECASE)
-    for match in go_matches:
+    for match, _ in results["go_interjections"]:
         print(f"   Found: '{match}'")
     print()
     
-    # 6. Lines ending with question marks (possibly with quotes/brackets)
-    question_pattern = r'.*\?[\s"\')\]]*$'
     print("6. QUESTION LINES:")
-    lines = test_text.strip().split('\n')
-    for line in lines:
-        if re.match(question_pattern, line):
-            print(f"   Found: {line.strip()}")
+    for line, _ in results["question_lines"]:
+        print(f"   Found: {line.strip()}")
     print()
 
 if __name__ == "__main__":
     # Run all examples
     test_regex_patterns()
-    
+
     print("\n" + "="*60)
     print("SUMMARY OF PATTERNS:")
     print("="*60)
-    patterns = {
-        "ZIP codes": r'\b\d{5}(?:[-\s]\d{4})?\b',
-        "Non-capital words": r"\b[^A-Z\s][^\s]*(?:['-][^\s]+)*\b",
-        "Numbers": r'[+-]?(?:\d{1,3}(?:,\d{3})*|\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?',
-        "Email variants": r'\be[-\s–]?mail\b',
-        "Go interjections": r'\bgo+\b[!.,?]?',
-        "Question lines": r'.*\?[\s"\')\]]*$'
-    }
-    
-    for name, pattern in patterns.items():
-        print(f"{name:18}: {pattern}")
\ No newline at end of file
+    for name, pattern in ORIGINAL_PATTERNS.items():
+        print(f"{PATTERN_LABELS[name]:18}: {pattern.pattern}")
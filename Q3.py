@@ -1,6 +1,12 @@
+import os
 import re
-from collections import defaultdict, Counter
-import copy
+import heapq
+from collections import defaultdict, Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import pickle
+import struct
+import numpy as np
 
 # Q3.1: Manual BPE on toy corpus
 def manual_bpe_toy_corpus():
@@ -39,39 +45,28 @@ def manual_bpe_toy_corpus():
     print(f"Initial vocabulary size: {len(initial_vocab)}")
     print()
     
-    # Initialize current state
-    current_words = copy.deepcopy(words_with_markers)
+    # Initialize current state: each word is a tuple of interned symbol ids
+    table = SymbolTable()
+    current_words = {table.encode(word): count for word, count in words_with_markers.items()}
     current_vocab = set(initial_vocab)
     
     # Function to get all bigram pairs and their counts
     def get_bigram_counts(word_dict):
         pair_counts = defaultdict(int)
-        for word, freq in word_dict.items():
-            chars = list(word)
-            for i in range(len(chars) - 1):
-                pair = (chars[i], chars[i + 1])
+        for symbols, freq in word_dict.items():
+            for pair in zip(symbols, symbols[1:]):
                 pair_counts[pair] += freq
         return pair_counts
     
     # Function to merge a pair in all words
     def merge_pair(word_dict, pair_to_merge):
+        first, second = pair_to_merge
+        new_token = table.symbols[first] + table.symbols[second]
+        new_id = table.intern(new_token)
+        
         new_word_dict = {}
-        old_char1, old_char2 = pair_to_merge
-        new_token = old_char1 + old_char2
-        
-        for word, freq in word_dict.items():
-            chars = list(word)
-            new_chars = []
-            i = 0
-            while i < len(chars):
-                if i < len(chars) - 1 and chars[i] == old_char1 and chars[i + 1] == old_char2:
-                    new_chars.append(new_token)
-                    i += 2
-                else:
-                    new_chars.append(chars[i])
-                    i += 1
-            new_word = ''.join(new_chars)
-            new_word_dict[new_word] = freq
+        for symbols, freq in word_dict.items():
+            new_word_dict[merge_symbols(symbols, first, second, new_id)] = freq
         return new_word_dict, new_token
     
     # Perform first three merges manually
@@ -85,135 +80,666 @@ def manual_bpe_toy_corpus():
         bigram_counts = get_bigram_counts(current_words)
         print("Bigram counts:")
         for pair, count in sorted(bigram_counts.items(), key=lambda x: -x[1]):
-            print(f"  {pair}: {count}")
+            print(f"  {table.decode(pair)}: {count}")
         
         # Find most frequent pair
         most_frequent_pair = max(bigram_counts.items(), key=lambda x: x[1])
         pair_to_merge, max_count = most_frequent_pair
         
-        print(f"\nMost frequent pair: {pair_to_merge} (count: {max_count})")
+        print(f"\nMost frequent pair: {table.decode(pair_to_merge)} (count: {max_count})")
         
         # Merge the pair
         current_words, new_token = merge_pair(current_words, pair_to_merge)
         current_vocab.add(new_token)
-        merges.append((pair_to_merge, new_token))
+        merges.append((table.decode(pair_to_merge), new_token))
         
         print(f"New token created: '{new_token}'")
         print(f"Updated corpus (first few examples):")
         
         # Show first few word examples
-        for i, (word, freq) in enumerate(current_words.items()):
+        for i, (symbols, freq) in enumerate(current_words.items()):
             if i < 5:  # Show first 5 words
-                print(f"  '{word}' (freq: {freq})")
+                print(f"  '{' '.join(table.decode(symbols))}' (freq: {freq})")
         
         print(f"Updated vocabulary size: {len(current_vocab)}")
         print(f"Current vocabulary: {sorted(list(current_vocab))}")
         print()
     
+    current_words = {table.decode(symbols): freq for symbols, freq in current_words.items()}
     return current_words, merges, current_vocab
 
-# Q3.2: Code a mini-BPE learner
-def coded_bpe_learner():
-    print("Q3.2: CODED MINI-BPE LEARNER")
-    print("-" * 40)
+# Interned symbols: every word is a tuple of small int ids, one per current token
+class SymbolTable:
+    def __init__(self, byte_level=False):
+        self.ids = {}
+        self.symbols = []
+        self.byte_level = byte_level
+        # In byte-level mode ids 0-255 are the single bytes, so a word's byte values are its ids
+        if byte_level:
+            for symbol in BYTE_SYMBOLS:
+                self.intern(symbol)
+    
+    def intern(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+        return symbol_id
+    
+    def encode(self, word):
+        """Word string -> tuple of character ids (bytes -> tuple of byte values)"""
+        if self.byte_level:
+            return tuple(word)
+        return tuple(self.intern(char) for char in word)
+    
+    def decode(self, ids):
+        return tuple(self.symbols[symbol_id] for symbol_id in ids)
+
+
+def merge_symbols(symbols, first, second, new_id):
+    """Replace each non-overlapping (first, second) in an id tuple with new_id, left to right"""
+    merged = []
+    j = 0
+    while j < len(symbols):
+        if (j < len(symbols) - 1 and 
+            symbols[j] == first and symbols[j + 1] == second):
+            merged.append(new_id)
+            j += 2
+        else:
+            merged.append(symbols[j])
+            j += 1
+    return tuple(merged)
+
+
+# Incremental pair counting shared by the BPE learners
+class PairMergeEngine:
+    """Pair counts + pair->words index, updated only for words touched by a merge"""
+    
+    def __init__(self, word_freqs, workers=None, byte_level=False):
+        # Words keep their first-seen order, which is what max() over a
+        # rebuilt pair dict would use to break ties
+        self.table = SymbolTable(byte_level)
+        self.words = [self.table.encode(word) for word in word_freqs]
+        self.freqs = list(word_freqs.values())
+        
+        # Initial counts depend only on the word table, so they can be sharded
+        if workers and workers > 1:
+            self.pair_counts, self.pair_words, self.pair_first = count_pairs_parallel(self.words, self.freqs, workers)
+        else:
+            self.pair_counts, self.pair_words, self.pair_first = count_pairs(self.words, self.freqs)
+        
+        # Heap of (-count, first word, first offset, pair): the top is the most frequent
+        # pair, ties going to the one seen first, so no tie scan is needed
+        self.heap = [self._heap_entry(pair) for pair in self.pair_counts]
+        heapq.heapify(self.heap)
+    
+    def _heap_entry(self, pair):
+        return (-self.pair_counts[pair],) + self.pair_first[pair] + (pair,)
+    
+    def _first_in_word(self, idx, pair):
+        """(idx, character offset) of pair's first occurrence in word idx"""
+        symbols = self.words[idx]
+        offset = 0
+        for j in range(len(symbols) - 1):
+            if symbols[j] == pair[0] and symbols[j + 1] == pair[1]:
+                return idx, offset
+            offset += len(self.table.symbols[symbols[j]])
+    
+    def _update_word(self, idx, symbols, new_symbols, stale_first):
+        """Apply the pair-count difference between a word's old and new symbols; return changed pairs"""
+        # Net change per pair, and the character offset of each pair's first occurrence in the new word.
+        # Offsets, unlike symbol positions, are not shifted by merges elsewhere in the word
+        delta = {}
+        for pair in zip(symbols, symbols[1:]):
+            delta[pair] = delta.get(pair, 0) - 1
+        new_first = {}
+        offset = 0
+        tokens = self.table.symbols
+        for pair in zip(new_symbols, new_symbols[1:]):
+            delta[pair] = delta.get(pair, 0) + 1
+            if pair not in new_first:
+                new_first[pair] = offset
+            offset += len(tokens[pair[0]])
+        
+        freq = self.freqs[idx]
+        changed = []
+        for pair, diff in delta.items():
+            if not diff:
+                continue
+            changed.append(pair)
+            count = self.pair_counts.get(pair, 0) + diff * freq
+            if count <= 0:
+                del self.pair_counts[pair]
+                del self.pair_words[pair]
+                del self.pair_first[pair]
+                stale_first.discard(pair)
+                continue
+            self.pair_counts[pair] = count
+            if pair in new_first:
+                self.pair_words[pair].add(idx)
+                first = (idx, new_first[pair])
+                current = self.pair_first.get(pair)
+                if current is None or current[0] >= idx:
+                    self.pair_first[pair] = first
+            else:
+                # Gone from this word; if this was its first word, look again once all words are done
+                self.pair_words[pair].discard(idx)
+                if self.pair_first[pair][0] == idx:
+                    stale_first.add(pair)
+        return changed
+    
+    def best_pair(self):
+        """Return (pair, count) for the most frequent pair (first seen among ties), or None if no pairs are left"""
+        # Pop stale entries until the top of the heap matches a live count and first occurrence
+        while self.heap:
+            neg_count, idx, offset, pair = self.heap[0]
+            if (self.pair_counts.get(pair, 0) == -neg_count and
+                    self.pair_first.get(pair) == (idx, offset)):
+                return self.table.decode(pair), -neg_count
+            heapq.heappop(self.heap)
+        return None
+    
+    def merge(self, pair):
+        """Merge pair in every word containing it, updating counts for those words only"""
+        new_token = pair[0] + pair[1]
+        first, second = self.table.ids[pair[0]], self.table.ids[pair[1]]
+        new_id = self.table.intern(new_token)
+        changed = set()
+        stale_first = set()
+        
+        # Ascending word order, so a new pair's first occurrence is set by its lowest word
+        for idx in sorted(self.pair_words.get((first, second), ())):
+            symbols = self.words[idx]
+            new_symbols = merge_symbols(symbols, first, second, new_id)
+            self.words[idx] = new_symbols
+            changed.update(self._update_word(idx, symbols, new_symbols, stale_first))
+        
+        for changed_pair in stale_first:
+            self.pair_first[changed_pair] = self._first_in_word(min(self.pair_words[changed_pair]), changed_pair)
+        
+        # Only pairs whose count changed need a new heap entry; the old ones go stale
+        for changed_pair in changed:
+            if changed_pair in self.pair_counts:
+                heapq.heappush(self.heap, self._heap_entry(changed_pair))
+        
+        return new_token
     
-    class BPELearner:
-        def __init__(self):
-            self.vocab = set()
-            self.merges = []
-            self.word_freqs = {}
-        
-        def train(self, corpus, num_merges=10):
-            """Train BPE on a corpus"""
-            # Initialize word frequencies
-            words = corpus.split()
-            self.word_freqs = Counter(word + '_' for word in words)
+    def word_table(self):
+        """Current words as tuples of token strings"""
+        return {self.table.decode(symbols): freq for symbols, freq in zip(self.words, self.freqs)}
+
+
+# Rank-based encoding shared by the BPE learners
+def merge_ranks(merges):
+    """Map each merge pair to the step it was first learned at"""
+    ranks = {}
+    for rank, pair in enumerate(merges):
+        ranks.setdefault(pair, rank)
+    return ranks
+
+
+def encode_with_ranks(symbols, ranks):
+    """Repeatedly merge the lowest-ranked adjacent pair (same result as replaying the merges)"""
+    symbols = list(symbols)
+    n = len(symbols)
+    if n < 2:
+        return symbols
+    
+    # Doubly linked list over symbol positions; merged-away slots become None
+    next_pos = list(range(1, n + 1))
+    next_pos[-1] = -1
+    prev_pos = list(range(-1, n - 1))
+    
+    # Heap of (rank, left position); equal ranks merge left to right
+    heap = []
+    for i in range(n - 1):
+        rank = ranks.get((symbols[i], symbols[i + 1]))
+        if rank is not None:
+            heap.append((rank, i))
+    heapq.heapify(heap)
+    
+    while heap:
+        rank, i = heapq.heappop(heap)
+        j = next_pos[i]
+        # Skip entries whose pair was consumed or changed by an earlier merge
+        if symbols[i] is None or j == -1 or ranks.get((symbols[i], symbols[j])) != rank:
+            continue
+        
+        symbols[i] = symbols[i] + symbols[j]
+        symbols[j] = None
+        next_pos[i] = next_pos[j]
+        if next_pos[j] != -1:
+            prev_pos[next_pos[j]] = i
+        
+        # Queue the two pairs the new token forms with its neighbours
+        left = prev_pos[i]
+        if left != -1:
+            rank = ranks.get((symbols[left], symbols[i]))
+            if rank is not None:
+                heapq.heappush(heap, (rank, left))
+        right = next_pos[i]
+        if right != -1:
+            rank = ranks.get((symbols[i], symbols[right]))
+            if rank is not None:
+                heapq.heappush(heap, (rank, i))
+    
+    return [symbol for symbol in symbols if symbol is not None]
+
+
+# Byte-level mode: a fixed base alphabet of all 256 single-byte tokens
+BYTE_SYMBOLS = [bytes([byte]) for byte in range(256)]
+WHITESPACE_BYTES = frozenset(b' \t\n\r\x0b\x0c')
+
+
+# Streaming word counts, so training memory scales with vocabulary size
+def count_words(texts, byte_level=False):
+    """Word (with end marker) -> frequency over an iterable of text pieces, in first-seen order"""
+    word_freqs = Counter()
+    for text in texts:
+        # Byte-level file blocks arrive as bytes; decode them so both modes (and encode_batch)
+        # split on the same whitespace. surrogateescape carries invalid UTF-8 through unchanged
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', 'surrogateescape')
+        word_freqs.update(text.split())
+    
+    # Add the end marker (and encode, in byte-level mode) once per distinct word
+    if byte_level:
+        return Counter({word.encode('utf-8', 'surrogateescape') + b'_': freq for word, freq in word_freqs.items()})
+    return Counter({word + '_': freq for word, freq in word_freqs.items()})
+
+
+def iter_file_text(paths, chunk_size=1 << 20, binary=False):
+    """Yield text (bytes if binary) from files in blocks of about chunk_size, cut at whitespace"""
+    is_space = WHITESPACE_BYTES.__contains__ if binary else str.isspace
+    for path in paths:
+        with open(path, 'rb') if binary else open(path, encoding='utf-8') as f:
+            tail = b'' if binary else ''
+            while True:
+                block = f.read(chunk_size)
+                if not block:
+                    break
+                block = tail + block
+                
+                # Hold back a trailing partial word until the next block arrives
+                cut = len(block)
+                while cut > 0 and not is_space(block[cut - 1]):
+                    cut -= 1
+                yield block[:cut]
+                tail = block[cut:]
+            if tail:
+                yield tail
+
+
+# Multiprocess counting; shards are reduced in input order so results match the serial path
+def iter_batches(texts, batch_size, batch_chars):
+    """Group texts into lists of at most batch_size pieces, closed early once they hold batch_chars"""
+    batch = []
+    size = 0
+    for text in texts:
+        batch.append(text)
+        size += len(text)
+        if len(batch) == batch_size or size >= batch_chars:
+            yield batch
+            batch = []
+            size = 0
+    if batch:
+        yield batch
+
+
+def count_words_parallel(texts, workers=None, batch_size=256, byte_level=False, batch_chars=1 << 20):
+    """count_words over a process pool, keeping the serial first-seen word order
+    
+    A shard is batch_size lines or about batch_chars of text, whichever comes first, so
+    megabyte file blocks go one per shard rather than batch_size at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+    word_freqs = Counter()
+    pending = deque()
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in iter_batches(texts, batch_size, batch_chars):
+            pending.append(pool.submit(count_words, batch, byte_level))
+            # Bound the number of in-flight shards (and so their text) so the input is still streamed
+            if len(pending) >= 2 * workers:
+                word_freqs.update(pending.popleft().result())
+        while pending:
+            word_freqs.update(pending.popleft().result())
+    
+    return word_freqs
+
+
+def count_pairs(words, freqs, start=0):
+    """Pair counts, pair -> word indices and pair -> first (word index, offset) for a slice of the word table"""
+    pair_counts = defaultdict(int)
+    pair_words = defaultdict(set)
+    pair_first = {}
+    for idx, (word, freq) in enumerate(zip(words, freqs), start):
+        for j in range(len(word) - 1):
+            pair = (word[j], word[j + 1])
+            pair_counts[pair] += freq
+            pair_words[pair].add(idx)
+            # Unmerged words have one character per symbol, so the position is the offset
+            pair_first.setdefault(pair, (idx, j))
+    return pair_counts, pair_words, pair_first
+
+
+def count_pairs_parallel(words, freqs, workers=None):
+    """count_pairs over a process pool, one contiguous slice of words per task"""
+    workers = workers or os.cpu_count() or 1
+    step = max(1, -(-len(words) // (4 * workers)))
+    pair_counts = defaultdict(int)
+    pair_words = defaultdict(set)
+    pair_first = {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(count_pairs, words[start:start + step], freqs[start:start + step], start)
+                   for start in range(0, len(words), step)]
+        # Shards come back in word order, so the first shard to see a pair has its first occurrence
+        for future in futures:
+            shard_counts, shard_words, shard_first = future.result()
+            for pair, count in shard_counts.items():
+                pair_counts[pair] += count
+            for pair, indices in shard_words.items():
+                pair_words[pair].update(indices)
+            for pair, first in shard_first.items():
+                pair_first.setdefault(pair, first)
+    
+    return pair_counts, pair_words, pair_first
+
+
+UNK_TOKEN = '<unk>'
+
+# Binary model format written by BPEModel.save
+MODEL_MAGIC = b'BPE1'
+MODEL_VERSION = 2
+MODEL_HEADER = struct.Struct('<4sIIII')
+MODEL_BYTE_LEVEL = 1
+
+
+# Bounded LRU cache of word -> segments
+class SegmentCache:
+    """LRU memo for segment_word with hit/miss counters (maxsize=0 disables it)"""
+    
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, word):
+        segments = self.entries.get(word)
+        if segments is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(word)
+        self.hits += 1
+        return segments
+    
+    def put(self, word, segments):
+        if self.maxsize <= 0:
+            return
+        self.entries[word] = segments
+        self.entries.move_to_end(word)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.entries), "maxsize": self.maxsize}
+
+
+# State and encoding shared by the BPE learners
+class BPEModel:
+    def __init__(self, cache_size=10000, byte_level=False):
+        self.byte_level = byte_level
+        self.vocab = set()
+        self.merges = []
+        self.ranks = {}
+        self.word_freqs = {}
+        self.cache = SegmentCache(cache_size)
+        self.token_to_id = {UNK_TOKEN: 0}
+        self.id_to_token = np.array([UNK_TOKEN], dtype=object)
+    
+    def normalize(self, word):
+        return word
+    
+    def prepare_word(self, word):
+        """Normalize and add the end-of-word marker (UTF-8 bytes in byte-level mode)"""
+        word = self.normalize(word)
+        if self.byte_level:
+            return word.encode('utf-8') + b'_'
+        return word + '_'
+    
+    def base_vocab(self, word_freqs):
+        """Characters seen in training, or all 256 bytes in byte-level mode"""
+        if self.byte_level:
+            return set(BYTE_SYMBOLS)
+        return {char for word in word_freqs for char in word}
+    
+    def merges_changed(self):
+        """Rebuild merge ranks and drop cached segmentations after self.merges changes"""
+        self.ranks = merge_ranks(self.merges)
+        self.cache.clear()
+        self.build_token_ids()
+    
+    def build_token_ids(self):
+        """Token ids: <unk>, then base symbols in sorted order, then merged tokens in merge order"""
+        merged = [first + second for first, second in self.merges]
+        parts = {part for pair in self.merges for part in pair}
+        tokens = dict.fromkeys([UNK_TOKEN] + sorted((self.vocab | parts) - set(merged)))
+        tokens.update(dict.fromkeys(merged))
+        self.token_to_id = {token: i for i, token in enumerate(tokens)}
+        self.id_to_token = np.array(list(tokens), dtype=object)
+    
+    def save(self, path):
+        """Write the model as: header, token offsets (int64), merges as int32 id pairs, UTF-8 token blob"""
+        # Byte-level tokens are already bytes and go into the blob as-is
+        encoded = [token if isinstance(token, bytes) else token.encode('utf-8') for token in self.id_to_token]
+        flags = MODEL_BYTE_LEVEL if self.byte_level else 0
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(token) for token in encoded])
+        merge_ids = np.array([(self.token_to_id[first], self.token_to_id[second])
+                              for first, second in self.merges], dtype=np.int32).reshape(-1, 2)
+        
+        with open(path, 'wb') as f:
+            f.write(MODEL_HEADER.pack(MODEL_MAGIC, MODEL_VERSION, len(encoded), len(self.merges), flags))
+            f.write(offsets.tobytes())
+            f.write(merge_ids.tobytes())
+            f.write(b''.join(encoded))
+    
+    @classmethod
+    def load(cls, path, cache_size=10000):
+        """Load a model written by save() from a read-only mmap
+        
+        The offsets and merge-id arrays are read in place; the token strings, id table and
+        merge ranks are Python objects built per process.
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, n_tokens, n_merges, flags = MODEL_HEADER.unpack_from(mapped, 0)
+        byte_level = bool(flags & MODEL_BYTE_LEVEL)
+        if magic != MODEL_MAGIC or version != MODEL_VERSION:
+            raise ValueError(f"{path} is not a BPE model file (version {MODEL_VERSION})")
+        
+        pos = MODEL_HEADER.size
+        offsets = np.frombuffer(mapped, dtype=np.int64, count=n_tokens + 1, offset=pos)
+        pos += offsets.nbytes
+        merge_ids = np.frombuffer(mapped, dtype=np.int32, count=2 * n_merges, offset=pos).reshape(-1, 2)
+        pos += merge_ids.nbytes
+        blob = memoryview(mapped)[pos:pos + int(offsets[-1])]
+        
+        spans = zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        if byte_level:
+            tokens = [UNK_TOKEN] + [bytes(blob[start:end]) for start, end in list(spans)[1:]]
+        else:
+            tokens = [str(blob[start:end], 'utf-8') for start, end in spans]
+        
+        model = cls(cache_size, byte_level)
+        model.mapped = mapped
+        model.merge_ids = merge_ids
+        model.vocab = set(tokens[1:])
+        model.merges = [(tokens[first], tokens[second]) for first, second in merge_ids.tolist()]
+        model.ranks = merge_ranks(model.merges)
+        # The file holds the id table in id order, so take it as-is instead of re-deriving it
+        model.token_to_id = dict(zip(tokens, range(len(tokens))))
+        model.id_to_token = np.array(tokens, dtype=object)
+        return model
+    
+    def start_training(self, word_freqs, workers=None, resume_from=None):
+        """Return (engine, first step), either fresh from word_freqs or restored from a checkpoint"""
+        if resume_from is not None:
+            with open(resume_from, 'rb') as f:
+                state = pickle.load(f)
+            if state['byte_level'] != self.byte_level:
+                raise ValueError(f"{resume_from} was written by a model with byte_level={state['byte_level']}")
+            self.word_freqs = state['word_freqs']
+            self.vocab = state['vocab']
+            self.merges = state['merges']
+            return state['engine'], state['step']
+        
+        if word_freqs is None:
+            raise ValueError("word_freqs is required unless resuming from a checkpoint")
+        self.word_freqs = word_freqs
+        
+        # Initialize base vocabulary (characters, or all bytes)
+        self.vocab = self.base_vocab(self.word_freqs)
+        return PairMergeEngine(self.word_freqs, workers, self.byte_level), 0
+    
+    def save_checkpoint(self, path, engine, step):
+        """Pickle the merge state (merges, vocab, word table, pair counts) so a run can resume"""
+        state = {"byte_level": self.byte_level, "step": step, "merges": self.merges,
+                 "vocab": self.vocab, "word_freqs": self.word_freqs, "engine": engine}
+        # Write next to the target and rename, so an interrupted save keeps the previous checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    
+    def stop_reason(self, count, target_vocab_size=None, min_frequency=None):
+        """Why training should stop before merging a pair seen count times, or None"""
+        if target_vocab_size is not None and len(self.vocab) >= target_vocab_size:
+            return f"reached target vocabulary size {target_vocab_size}"
+        if min_frequency is not None and count < min_frequency:
+            return f"best pair frequency {count} is below {min_frequency}"
+        return None
+    
+    def resume(self, path, num_merges, checkpoint_path=None, **options):
+        """Continue a checkpointed run up to num_merges total merges
+        
+        New checkpoints go to checkpoint_path, by default the file the run resumes from.
+        """
+        return self.train_counts(None, num_merges, resume_from=path,
+                                 checkpoint_path=checkpoint_path or path, **options)
+    
+    def train_from_lines(self, lines, num_merges, workers=None, **options):
+        """Train on an iterable of text lines without holding the corpus in memory"""
+        if workers and workers > 1:
+            word_freqs = count_words_parallel(lines, workers, byte_level=self.byte_level)
+        else:
+            word_freqs = count_words(lines, self.byte_level)
+        return self.train_counts(word_freqs, num_merges, workers, **options)
+    
+    def train_from_files(self, paths, num_merges, workers=None, **options):
+        """Train on text files, streamed in fixed-size blocks"""
+        return self.train_from_lines(iter_file_text(paths, binary=self.byte_level), num_merges, workers, **options)
+    
+    def segment_word(self, word):
+        word = self.prepare_word(word)
+        segments = self.cache.get(word)
+        if segments is None:
+            # Merge lowest-ranked pairs first; cost depends on word length, not merge count
+            symbols = [BYTE_SYMBOLS[byte] for byte in word] if self.byte_level else word
+            segments = tuple(encode_with_ranks(symbols, self.ranks))
+            self.cache.put(word, segments)
+        return list(segments)
+    
+    def encode_batch(self, texts):
+        """Encode texts to a flat int32 id buffer plus offsets (row i is ids[offsets[i]:offsets[i + 1]])"""
+        token_to_id = self.token_to_id
+        word_ids = {}  # per-batch memo so repeated words skip segmentation and lookup
+        ids = []
+        offsets = [0]
+        
+        for text in texts:
+            for word in text.split():
+                cached = word_ids.get(word)
+                if cached is None:
+                    cached = [token_to_id.get(token, 0) for token in self.segment_word(word)]
+                    word_ids[word] = cached
+                ids.extend(cached)
+            offsets.append(len(ids))
+        
+        return np.array(ids, dtype=np.int32), np.array(offsets, dtype=np.int64)
+    
+    def decode_batch(self, ids, offsets):
+        """Inverse of encode_batch; end-of-word markers become spaces"""
+        # One fancy-indexing gather into the shared token table, no per-token lookups
+        tokens = self.id_to_token[np.asarray(ids, dtype=np.int64)]
+        if self.byte_level:
+            tokens[tokens == UNK_TOKEN] = b'\xef\xbf\xbd'  # never produced by encode; U+FFFD if present
+            return [b''.join(tokens[offsets[i]:offsets[i + 1]]).replace(b'_', b' ').decode('utf-8', 'replace').rstrip()
+                    for i in range(len(offsets) - 1)]
+        return [''.join(tokens[offsets[i]:offsets[i + 1]]).replace('_', ' ').rstrip()
+                for i in range(len(offsets) - 1)]
+
+
+# Q3.2: Code a mini-BPE learner
+class BPELearner(BPEModel):
+    def train(self, corpus, num_merges=10, **options):
+        """Train BPE on a corpus (options as in train_counts)"""
+        return self.train_counts(count_words([corpus], self.byte_level), num_merges, **options)
+    
+    def train_counts(self, word_freqs, num_merges=10, workers=None, target_vocab_size=None,
+                     min_frequency=None, checkpoint_path=None, checkpoint_every=1000, resume_from=None):
+        """Train BPE on a word (with end marker) -> frequency table"""
+        engine, start = self.start_training(word_freqs, workers, resume_from)
+        
+        print(f"Initial vocabulary size: {len(self.vocab)}")
+        print(f"Initial vocab: {sorted(self.vocab)}")
+        print()
+        
+        # Perform merges
+        for i in range(start, num_merges):
+            # Find most frequent pair
+            best_pair = engine.best_pair()
+            if best_pair is None:
+                break
+            pair_to_merge, count = best_pair
             
-            # Initialize vocabulary with characters
-            self.vocab = set()
-            for word in self.word_freqs:
-                for char in word:
-                    self.vocab.add(char)
+            reason = self.stop_reason(count, target_vocab_size, min_frequency)
+            if reason:
+                print(f"Stopping at step {i + 1}: {reason}")
+                break
             
-            print(f"Initial vocabulary size: {len(self.vocab)}")
-            print(f"Initial vocab: {sorted(self.vocab)}")
-            print()
+            print(f"Step {i + 1}: Merging {pair_to_merge} (count: {count})")
             
-            # Perform merges
-            current_words = dict(self.word_freqs)
+            # Merge pair, touching only the words that contain it
+            new_token = engine.merge(pair_to_merge)
+            self.merges.append(pair_to_merge)
+            self.vocab.add(new_token)
             
-            for i in range(num_merges):
-                # Get pair counts
-                pair_counts = defaultdict(int)
-                for word, freq in current_words.items():
-                    chars = word.split() if ' ' in word else list(word)
-                    for j in range(len(chars) - 1):
-                        pair = (chars[j], chars[j + 1])
-                        pair_counts[pair] += freq
-                
-                if not pair_counts:
-                    break
-                
-                # Find most frequent pair
-                best_pair = max(pair_counts.items(), key=lambda x: x[1])
-                pair_to_merge, count = best_pair
-                
-                print(f"Step {i + 1}: Merging {pair_to_merge} (count: {count})")
-                
-                # Merge pair
-                new_token = pair_to_merge[0] + pair_to_merge[1]
-                self.merges.append(pair_to_merge)
-                self.vocab.add(new_token)
-                
-                # Update words
-                new_words = {}
-                for word, freq in current_words.items():
-                    chars = word.split() if ' ' in word else list(word)
-                    new_chars = []
-                    j = 0
-                    while j < len(chars):
-                        if (j < len(chars) - 1 and 
-                            chars[j] == pair_to_merge[0] and 
-                            chars[j + 1] == pair_to_merge[1]):
-                            new_chars.append(new_token)
-                            j += 2
-                        else:
-                            new_chars.append(chars[j])
-                            j += 1
-                    
-                    new_word = ' '.join(new_chars) if len(new_chars) > 1 else ''.join(new_chars)
-                    new_words[new_word] = freq
-                
-                current_words = new_words
-                print(f"  New token: '{new_token}'")
-                print(f"  Vocabulary size: {len(self.vocab)}")
-                print()
+            print(f"  New token: '{new_token}'")
+            print(f"  Vocabulary size: {len(self.vocab)}")
+            print()
             
-            self.final_words = current_words
-            return self.merges, self.vocab
+            if checkpoint_path and (i + 1) % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint_path, engine, i + 1)
         
-        def segment_word(self, word):
-            word = word + '_'
-            chars = list(word)
-            
-            # Apply merges in order
-            for merge_pair in self.merges:
-                old1, old2 = merge_pair
-                new_token = old1 + old2
-                
-                new_chars = []
-                i = 0
-                while i < len(chars):
-                    if (i < len(chars) - 1 and 
-                        chars[i] == old1 and chars[i + 1] == old2):
-                        new_chars.append(new_token)
-                        i += 2
-                    else:
-                        new_chars.append(chars[i])
-                        i += 1
-                chars = new_chars
-            
-            return chars
+        self.final_words = engine.word_table()
+        self.merges_changed()
+        return self.merges, self.vocab
+
+
+def coded_bpe_learner():
+    print("Q3.2: CODED MINI-BPE LEARNER")
+    print("-" * 40)
     
     # Train on toy corpus
     toy_corpus = "low low low low low lowest lowest newer newer newer newer newer newer wider wider wider new new"
@@ -258,6 +784,70 @@ def coded_bpe_learner():
     
     return bpe
 
+# BPE learner used for the English paragraph in Q3.3
+class AdvancedBPE(BPEModel):
+    def normalize(self, word):
+        return word.lower()
+    
+    def train(self, text, num_merges=30, **options):
+        """Train BPE on text with specified number of merges (options as in train_counts)"""
+        return self.train_counts(count_words([text], self.byte_level), num_merges, **options)
+    
+    def train_counts(self, word_freqs, num_merges=30, workers=None, target_vocab_size=None,
+                     min_frequency=None, checkpoint_path=None, checkpoint_every=1000, resume_from=None):
+        """Train BPE on a word (with end marker) -> frequency table"""
+        engine, start = self.start_training(word_freqs, workers, resume_from)
+        
+        print(f"Training on {sum(self.word_freqs.values())} tokens, {len(self.word_freqs)} unique words")
+        print(f"Initial vocabulary size: {len(self.vocab)}")
+        
+        merge_frequencies = []
+        
+        for i in range(start, num_merges):
+            # Find most frequent pair
+            best_pair = engine.best_pair()
+            if best_pair is None:
+                print(f"No more pairs to merge at step {i}")
+                break
+            best_pair, count = best_pair
+            
+            reason = self.stop_reason(count, target_vocab_size, min_frequency)
+            if reason:
+                print(f"Stopping at step {i + 1}: {reason}")
+                break
+            merge_frequencies.append((best_pair, count))
+            
+            if i < 5:  # Show first 5 merges
+                print(f"Merge {i + 1}: {best_pair} (freq: {count})")
+            
+            # Create new token, update vocabulary and the words containing the pair
+            new_token = engine.merge(best_pair)
+            self.merges.append(best_pair)
+            self.vocab.add(new_token)
+            
+            if checkpoint_path and (i + 1) % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint_path, engine, i + 1)
+        
+        self.final_words = engine.word_table()
+        self.merges_changed()
+        
+        # Find longest tokens
+        longest_tokens = sorted([token for token in self.vocab if len(token) > 1], 
+                              key=len, reverse=True)[:5]
+        
+        print(f"\nCompleted {len(self.merges)} merges")
+        print(f"Final vocabulary size: {len(self.vocab)}")
+        print(f"\nTop 5 most frequent merges:")
+        for i, (pair, freq) in enumerate(merge_frequencies[:5], 1):
+            print(f"  {i}. {pair} → {pair[0] + pair[1]} (freq: {freq})")
+        
+        print(f"\n5 longest subword tokens:")
+        for i, token in enumerate(longest_tokens, 1):
+            print(f"  {i}. '{token}' (length: {len(token)})")
+        
+        return self.merges, self.vocab, longest_tokens
+
+
 # Q3.3: BPE on your language (English paragraph)
 def bpe_on_paragraph():
     print("\n\nQ3.3: BPE ON ENGLISH PARAGRAPH")
@@ -278,102 +868,6 @@ def bpe_on_paragraph():
     print(f"Training text: {text}")
     print()
     
-    class AdvancedBPE:
-        def __init__(self):
-            self.vocab = set()
-            self.merges = []
-            self.word_freqs = {}
-        
-        def train(self, text, num_merges=30):
-            """Train BPE on text with specified number of merges"""
-            words = text.split()
-            self.word_freqs = Counter(word + '_' for word in words)
-            
-            # Initialize character vocabulary
-            self.vocab = set()
-            for word in self.word_freqs:
-                for char in word:
-                    self.vocab.add(char)
-            
-            print(f"Training on {len(words)} tokens, {len(set(words))} unique words")
-            print(f"Initial vocabulary size: {len(self.vocab)}")
-            
-            current_words = dict(self.word_freqs)
-            merge_frequencies = []
-            
-            for i in range(num_merges):
-                # Get pair counts
-                pair_counts = defaultdict(int)
-                for word, freq in current_words.items():
-                    chars = list(word)
-                    for j in range(len(chars) - 1):
-                        pair = (chars[j], chars[j + 1])
-                        pair_counts[pair] += freq
-                
-                if not pair_counts:
-                    print(f"No more pairs to merge at step {i}")
-                    break
-                
-                # Find most frequent pair
-                best_pair, count = max(pair_counts.items(), key=lambda x: x[1])
-                merge_frequencies.append((best_pair, count))
-                
-                if i < 5:  # Show first 5 merges
-                    print(f"Merge {i + 1}: {best_pair} (freq: {count})")
-                
-                # Create new token and update vocabulary
-                new_token = best_pair[0] + best_pair[1]
-                self.merges.append(best_pair)
-                self.vocab.add(new_token)
-                
-                # Update all words
-                new_words = {}
-                for word, freq in current_words.items():
-                    new_word = word.replace(best_pair[0] + best_pair[1], new_token)
-                    new_words[new_word] = freq
-                
-                current_words = new_words
-            
-            self.final_words = current_words
-            
-            # Find longest tokens
-            longest_tokens = sorted([token for token in self.vocab if len(token) > 1], 
-                                  key=len, reverse=True)[:5]
-            
-            print(f"\nCompleted {len(self.merges)} merges")
-            print(f"Final vocabulary size: {len(self.vocab)}")
-            print(f"\nTop 5 most frequent merges:")
-            for i, (pair, freq) in enumerate(merge_frequencies[:5], 1):
-                print(f"  {i}. {pair} → {pair[0] + pair[1]} (freq: {freq})")
-            
-            print(f"\n5 longest subword tokens:")
-            for i, token in enumerate(longest_tokens, 1):
-                print(f"  {i}. '{token}' (length: {len(token)})")
-            
-            return self.merges, self.vocab, longest_tokens
-        
-        def segment_word(self, word):
-            word = word.lower() + '_'
-            chars = list(word)
-            
-            for merge_pair in self.merges:
-                old1, old2 = merge_pair
-                new_token = old1 + old2
-                
-                new_chars = []
-                i = 0
-                while i < len(chars):
-                    if (i < len(chars) - 1 and 
-                        chars[i] == old1 and chars[i + 1] == old2):
-                        new_chars.append(new_token)
-                        i += 2
-                    else:
-                        new_chars.append(chars[i])
-                        i += 1
-                chars = new_chars
-            
-            return chars
-    
     # Train BPE
     bpe = AdvancedBPE()
     merges, vocab, longest_tokens = bpe.train(text, num_merges=30)
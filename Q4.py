@@ -1,87 +1,735 @@
-import numpy as np
+import functools
+import heapq
+import math
+import os
 
-def edit_distance(s1, s2, sub_cost=1, ins_cost=1, del_cost=1):
-    """Compute minimum edit distance with DP"""
+# NumPy (and the process-pool machinery) are imported inside the functions that need
+# them, so importing this module for the pure-Python kernels stays cheap
+
+# Below this many DP cells the pure-Python kernel beats the NumPy row kernel
+PYTHON_DP_MAX_CELLS = 2048
+
+class CostTable:
+    """Per-character edit costs: a substitution matrix and insert/delete vectors over an alphabet
+    
+    sub[a][b] is the cost of replacing alphabet[a] with alphabet[b], ins[a] / dele[a] the cost
+    of inserting / deleting alphabet[a]. Characters outside the alphabet use the scalar
+    defaults, and a match always costs 0 whatever the diagonal says.
+    """
+    
+    def __init__(self, alphabet='', sub=None, ins=None, dele=None, sub_cost=1, ins_cost=1, del_cost=1):
+        import numpy as np
+        self.alphabet = list(alphabet)
+        self.index = {c: i for i, c in enumerate(self.alphabet)}
+        k = len(self.alphabet)
+        
+        # One extra row/column/slot at index k holds the defaults for unknown characters
+        self.sub = self.overlay(np.full((k + 1, k + 1), sub_cost), sub, "sub")
+        self.ins = self.overlay(np.full(k + 1, ins_cost), ins, "ins")
+        self.dele = self.overlay(np.full(k + 1, del_cost), dele, "dele")
+        
+        # One dtype for all three, so a fractional cost anywhere makes every DP row float
+        dtype = np.result_type(self.sub, self.ins, self.dele)
+        self.sub, self.ins, self.dele = self.sub.astype(dtype), self.ins.astype(dtype), self.dele.astype(dtype)
+    
+    @staticmethod
+    def overlay(defaults, values, name):
+        """Copy user-supplied costs over the known-character part of a defaults array"""
+        import numpy as np
+        if values is None:
+            return defaults
+        values = np.asarray(values)
+        known = (slice(-1),) * defaults.ndim
+        if values.shape != defaults[known].shape:
+            raise ValueError(f"{name} costs must have shape {defaults[known].shape}, got {values.shape}")
+        defaults = defaults.astype(np.result_type(defaults, values))
+        defaults[known] = values
+        return defaults
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def uniform(cls, sub_cost=1, ins_cost=1, del_cost=1):
+        return cls(sub_cost=sub_cost, ins_cost=ins_cost, del_cost=del_cost)
+    
+    @property
+    def symmetric(self):
+        """True if d(a, b) == d(b, a) for every pair of strings"""
+        import numpy as np
+        return bool(np.array_equal(self.ins, self.dele) and np.array_equal(self.sub, self.sub.T))
+    
+    def lookup(self, chars):
+        """Costs for a list of distinct characters, re-indexed 0..len(chars)-1"""
+        import numpy as np
+        rows = np.array([self.index.get(c, len(self.alphabet)) for c in chars], dtype=np.intp)
+        sub = self.sub[np.ix_(rows, rows)]
+        np.fill_diagonal(sub, 0)
+        return sub, self.ins[rows], self.dele[rows]
+    
+    def compile(self, *strings):
+        """Build a compact alphabet over the given strings (once per call) and return each
+        string as an array of its ids, plus the matching sub matrix and ins/dele vectors"""
+        import numpy as np
+        chars = sorted(set().union(*strings))
+        ids = {c: i for i, c in enumerate(chars)}
+        encoded = [np.array([ids[c] for c in s], dtype=np.intp) for s in strings]
+        return encoded, *self.lookup(chars)
+
+def as_cost_table(costs):
+    """Accept either a CostTable or a (sub, ins, del) tuple"""
+    return costs if isinstance(costs, CostTable) else CostTable.uniform(*costs)
+
+def dp_rows(s1, s2, sub_cost=1, ins_cost=1, del_cost=1, table=None):
+    """Yield DP rows 0..m, each built from the previous one with whole-row NumPy ops
+    
+    table (a CostTable) replaces the three scalar costs with per-character ones.
+    """
+    import numpy as np
+    table = table or CostTable.uniform(sub_cost, ins_cost, del_cost)
     m, n = len(s1), len(s2)
-    dp = np.zeros((m + 1, n + 1), dtype=int)
     
-    # Initialize first row and column
-    for i in range(m + 1):
-        dp[i][0] = i * del_cost
-    for j in range(n + 1):
-        dp[0][j] = j * ins_cost
+    # Characters as compact ids, so a row of costs is one array lookup
+    (a1, a2), sub, ins, dele = table.compile(s1, s2)
+    # Rows take the promoted dtype of all three costs; an int row would truncate fractional ones
+    dtype = np.result_type(sub, ins, dele)
+    ins_steps = np.concatenate(([0], np.cumsum(ins[a2]))).astype(dtype)
+    del_steps = np.concatenate(([0], np.cumsum(dele[a1]))).astype(dtype)
+    
+    prev = ins_steps
+    yield prev
     
-    # Fill DP matrix
     for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if s1[i-1] == s2[j-1]:
-                dp[i][j] = dp[i-1][j-1]  # Match
-            else:
-                substitute = dp[i-1][j-1] + sub_cost
-                insert = dp[i][j-1] + ins_cost  
-                delete = dp[i-1][j] + del_cost
-                dp[i][j] = min(substitute, insert, delete)
+        c = a1[i - 1]
+        row = np.empty(n + 1, dtype=dtype)
+        row[0] = del_steps[i]
+        
+        # Match/substitute from the diagonal, delete from above
+        diagonal = prev[:-1] + sub[c][a2]
+        row[1:] = np.minimum(diagonal, prev[1:] + dele[c])
+        
+        # Insert chains run left to right: dp[i][j] = min_k (row[k] + ins(k+1..j)),
+        # which is a cumulative min once the running insertion cost is taken out
+        row = np.minimum.accumulate(row - ins_steps) + ins_steps
+        yield row
+        prev = row
+
+def fill_dp_matrix(s1, s2, sub_cost=1, ins_cost=1, del_cost=1, table=None):
+    """Fill the (m+1) x (n+1) DP matrix one row at a time"""
+    import numpy as np
+    rows = dp_rows(s1, s2, sub_cost, ins_cost, del_cost, table)
+    first = next(rows)
+    # Integer tables give an int matrix, float tables a float one
+    dp = np.empty((len(s1) + 1, len(first)), dtype=first.dtype)
+    dp[0] = first
+    for i, row in enumerate(rows, 1):
+        dp[i] = row
+    return dp
+
+def last_dp_row(s1, s2, sub_cost=1, ins_cost=1, del_cost=1, table=None):
+    """Bottom row of the DP matrix in O(n) memory (only two rows are alive at a time)"""
+    for row in dp_rows(s1, s2, sub_cost, ins_cost, del_cost, table):
+        pass
+    return row
+
+def python_distance(s1, s2, sub_cost=1, ins_cost=1, del_cost=1):
+    """Two-row DP on plain Python ints; on short strings this beats the NumPy rows, which pay per-call array overhead"""
+    prev = [j * ins_cost for j in range(len(s2) + 1)]
+    for i, c1 in enumerate(s1, 1):
+        cur = [i * del_cost]
+        left = cur[0]
+        for j, c2 in enumerate(s2, 1):
+            best = prev[j - 1] + (0 if c1 == c2 else sub_cost)
+            if prev[j] + del_cost < best:
+                best = prev[j] + del_cost
+            if left + ins_cost < best:
+                best = left + ins_cost
+            cur.append(best)
+            left = best
+        prev = cur
+    return prev[-1]
+
+def myers_distance(s1, s2):
+    """Unit-cost edit distance with Myers/Hyyro bit vectors (Python ints as arbitrary-width words)"""
+    m = len(s1)
+    if m == 0:
+        return len(s2)
+    
+    # Bit i of peq[c] is set where s1[i] == c
+    peq = {}
+    for i, c in enumerate(s1):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv = full, 0  # vertical +1 / -1 deltas down the current column
+    score = m
+    
+    for c in s2:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        
+        # Track the bottom cell, dp[m][j]
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        
+        # Row 0 grows by one per column, so shift a +1 in at the top
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
     
+    return score
+
+def banded_distance(s1, s2, max_distance, sub_cost=1, ins_cost=1, del_cost=1, table=None):
+    """Edit distance if it is <= max_distance, else max_distance + 1 (Ukkonen diagonal band)"""
+    m, n = len(s1), len(s2)
+    over = max_distance + 1
+    
+    # Plain lists: element access in the pure-Python loop is much cheaper than on arrays
+    if table is None:
+        # Scalar costs: build the same lists directly, keeping short calls free of NumPy overhead
+        ids = {}
+        a1 = [ids.setdefault(c, len(ids)) for c in s1]
+        a2 = [ids.setdefault(c, len(ids)) for c in s2]
+        sub = [[sub_cost] * len(ids) for _ in ids]
+        for c in range(len(ids)):
+            sub[c][c] = 0
+        ins, dele = [ins_cost] * len(ids), [del_cost] * len(ids)
+    else:
+        (a1, a2), sub, ins, dele = table.compile(s1, s2)
+        a1, a2, sub, ins, dele = a1.tolist(), a2.tolist(), sub.tolist(), ins.tolist(), dele.tolist()
+    min_ins = min(ins) if ins else 0
+    min_del = min(dele) if dele else 0
+    
+    # Length difference alone already costs that many insertions or deletions
+    if (n - m) * min_ins > max_distance or (m - n) * min_del > max_distance:
+        return over
+    
+    # Cell (i, j) sits on diagonal d = j - i and needs at least d insertions (or -d deletions).
+    # Float floor division can come out one short (0.3 // 0.1 == 2.0), so keep a spare diagonal
+    lo = -int(max_distance // min_del) - 1 if min_del else -m
+    hi = int(max_distance // min_ins) + 1 if min_ins else n
+    lo, hi = max(lo, -m), min(hi, n)
+    width = hi - lo + 1
+    
+    # Rows are indexed by diagonal: (i-1, j-1) is the same slot, (i-1, j) the next, (i, j-1) the previous
+    prev = [over] * width
+    ins2 = [ins[c] for c in a2]  # insertion cost of each character of s2
+    cost = 0
+    for j in range(0, hi + 1):
+        if j > 0:
+            cost += ins2[j - 1]
+        prev[j - lo] = min(cost, over)
+    
+    start = 0
+    for i in range(1, m + 1):
+        cur = [over] * width
+        c1 = a1[i - 1]
+        sub_row = sub[c1]
+        del_c1 = dele[c1]
+        start += del_c1
+        for k in range(width):
+            j = i + lo + k
+            if j < 0 or j > n:
+                continue
+            if j == 0:
+                cur[k] = min(start, over)
+                continue
+            best = prev[k] + sub_row[a2[j - 1]]
+            if k + 1 < width and prev[k + 1] + del_c1 < best:
+                best = prev[k + 1] + del_c1
+            if k > 0 and cur[k - 1] + ins2[j - 1] < best:
+                best = cur[k - 1] + ins2[j - 1]
+            cur[k] = min(best, over)
+        
+        # Costs never decrease along a path, so once a whole row is over the limit we are done
+        if min(cur) > max_distance:
+            return over
+        prev = cur
+    
+    # Fractional costs can land strictly between max_distance and the sentinel
+    distance = prev[n - m - lo]
+    return distance if distance <= max_distance else over
+
+def edit_distance(s1, s2, sub_cost=1, ins_cost=1, del_cost=1, return_matrix=True, max_distance=None, table=None):
+    """Compute minimum edit distance with DP; returns (distance, dp), dp is None if return_matrix=False
+    
+    With max_distance set only the diagonal band is computed (no matrix), and any
+    distance above it comes back as the sentinel max_distance + 1. table (a CostTable)
+    replaces the scalar costs with per-character ones on every path.
+    """
+    m, n = len(s1), len(s2)
+    
+    if max_distance is not None:
+        return banded_distance(s1, s2, max_distance, sub_cost, ins_cost, del_cost, table), None
+    
+    # Unit costs and no matrix wanted: the bit-parallel path does O(n * m/w) word operations
+    if not return_matrix and table is None and sub_cost == ins_cost == del_cost == 1:
+        return myers_distance(s1, s2), None
+    
+    # Small scalar-cost problems: plain ints are faster than NumPy rows and need no NumPy import
+    if not return_matrix and table is None and m * n <= PYTHON_DP_MAX_CELLS:
+        return python_distance(s1, s2, sub_cost, ins_cost, del_cost), None
+    
+    # Distance only: keep two rows instead of the whole matrix
+    if not return_matrix:
+        return last_dp_row(s1, s2, sub_cost, ins_cost, del_cost, table)[n], None
+    
+    dp = fill_dp_matrix(s1, s2, sub_cost, ins_cost, del_cost, table)
     return dp[m][n], dp
 
-def get_alignment(s1, s2, dp, sub_cost=1, ins_cost=1, del_cost=1):
+def get_alignment(s1, s2, dp, sub_cost=1, ins_cost=1, del_cost=1, table=None):
     """Backtrack to get one valid edit sequence"""
+    table = table or CostTable.uniform(sub_cost, ins_cost, del_cost)
+    (a1, a2), sub, ins, dele = table.compile(s1, s2)
     i, j = len(s1), len(s2)
     operations = []
     
+    # The rows' cumulative-min scan rounds fractional costs differently from a single step's
+    # sum, so an exact == test could fail on every branch and the walk would never move
+    def same(a, b):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    
     while i > 0 or j > 0:
-        if i > 0 and j > 0 and s1[i-1] == s2[j-1] and dp[i][j] == dp[i-1][j-1]:
+        if i > 0 and j > 0 and s1[i-1] == s2[j-1] and same(dp[i][j], dp[i-1][j-1]):
             operations.append(f"Match '{s1[i-1]}'")
             i, j = i-1, j-1
-        elif i > 0 and j > 0 and dp[i][j] == dp[i-1][j-1] + sub_cost:
+        elif i > 0 and j > 0 and same(dp[i][j], dp[i-1][j-1] + sub[a1[i-1], a2[j-1]]):
             operations.append(f"Substitute '{s1[i-1]}' → '{s2[j-1]}'")
             i, j = i-1, j-1
-        elif j > 0 and dp[i][j] == dp[i][j-1] + ins_cost:
+        elif j > 0 and same(dp[i][j], dp[i][j-1] + ins[a2[j-1]]):
             operations.append(f"Insert '{s2[j-1]}'")
             j = j-1
-        elif i > 0 and dp[i][j] == dp[i-1][j] + del_cost:
+        elif i > 0 and same(dp[i][j], dp[i-1][j] + dele[a1[i-1]]):
             operations.append(f"Delete '{s1[i-1]}'")
             i = i-1
+        else:
+            raise ValueError(f"dp does not match these strings and costs at cell ({i}, {j})")
     
     return list(reversed(operations))
 
-# Q4: Sunday → Saturday
-print("Q4: Edit Distance - Sunday → Saturday")
-print("=" * 40)
+def hirschberg_alignment(s1, s2, sub_cost=1, ins_cost=1, del_cost=1, table=None):
+    """Same kind of edit sequence as get_alignment, in O(m + n) memory (Hirschberg divide and conquer)"""
+    import numpy as np
+    m, n = len(s1), len(s2)
+    if m == 0:
+        return [f"Insert '{c}'" for c in s2]
+    if n == 0:
+        return [f"Delete '{c}'" for c in s1]
+    if m == 1 or n == 1:
+        # One side is a single character, so the full matrix is only 2 x (n+1) or (m+1) x 2
+        dp = fill_dp_matrix(s1, s2, sub_cost, ins_cost, del_cost, table)
+        return get_alignment(s1, s2, dp, sub_cost, ins_cost, del_cost, table)
+    
+    # Cost of the top half to every column, and of the bottom half (run backwards) from every column
+    mid = m // 2
+    forward = last_dp_row(s1[:mid], s2, sub_cost, ins_cost, del_cost, table)
+    backward = last_dp_row(s1[mid:][::-1], s2[::-1], sub_cost, ins_cost, del_cost, table)
+    
+    # An optimal path crosses row mid at the column minimizing the two halves' total
+    split = int(np.argmin(forward + backward[::-1]))
+    
+    return (hirschberg_alignment(s1[:mid], s2[:split], sub_cost, ins_cost, del_cost, table) +
+            hirschberg_alignment(s1[mid:], s2[split:], sub_cost, ins_cost, del_cost, table))
+
+def encode_strings(strings):
+    """Pad strings into an (N, max_len) int array of code points (-1 = padding) plus their lengths"""
+    import numpy as np
+    lengths = np.array([len(s) for s in strings], dtype=np.int64)
+    codes = np.full((len(strings), int(lengths.max()) if len(strings) else 0), -1, dtype=np.int64)
+    for i, s in enumerate(strings):
+        codes[i, :len(s)] = [ord(c) for c in s]
+    return codes, lengths
 
-s1, s2 = "Sunday", "Saturday"
+def edit_distance_many(query, candidates, costs=(1, 1, 1), max_distance=None, top_k=10, encoded=None):
+    """Distances from query to every candidate, computed for all candidates in lockstep
+    
+    costs is (sub, ins, del) as in edit_distance, or a CostTable. Pass encoded=encode_strings(candidates)
+    to reuse the padded array across queries. With max_distance set, candidates over it
+    are dropped as soon as a whole DP row exceeds it and get the sentinel max_distance + 1.
+    Returns (distances, nearest) where nearest is up to top_k (candidate, distance)
+    pairs, closest first, ties in candidate order.
+    """
+    import numpy as np
+    table = as_cost_table(costs)
+    codes, lengths = encoded if encoded is not None else encode_strings(candidates)
+    m = len(query)
+    width = codes.shape[1]
+    
+    # Compact alphabet over the query and every candidate; padding gets the extra id k,
+    # whose costs are never read back
+    query_points = np.array([ord(c) for c in query], dtype=np.int64)
+    top = max(int(codes.max(initial=-1)), int(query_points.max(initial=-1)))
+    seen = np.zeros(top + 2, dtype=bool)
+    seen[codes] = True
+    seen[query_points] = True
+    seen[-1] = False  # padding (-1) lands in this spare slot
+    points = np.flatnonzero(seen)
+    k = len(points)
+    sub, ins, dele = table.lookup([chr(c) for c in points])
+    padded = np.zeros((k + 1, k + 1), dtype=sub.dtype)
+    padded[:k, :k] = sub
+    sub = padded
+    ins = np.append(ins, 0)
+    
+    # Code point -> id lookup table; padding wraps round to the spare slot, which holds k
+    to_id = np.full(top + 2, k)
+    to_id[points] = np.arange(k)
+    ids = to_id[codes]
+    query_ids = to_id[query_points]
+    
+    # Running insertion cost along each candidate, and deletion cost down the query, in the
+    # promoted dtype of all three costs so fractional substitutions or deletions are not truncated
+    dtype = np.result_type(sub, ins, dele)
+    ins_steps = np.concatenate([np.zeros((len(lengths), 1)), np.cumsum(ins[ids], axis=1)], axis=1).astype(dtype)
+    del_steps = np.concatenate(([0], np.cumsum(dele[query_ids]))).astype(dtype)
+    
+    alive = np.arange(len(lengths))
+    if max_distance is not None:
+        distances = np.full(len(lengths), max_distance + 1, dtype=np.result_type(dtype, max_distance + 1))
+        # Length difference alone already costs that many insertions or deletions
+        min_ins = ins[:k].min() if k else 0
+        min_del = dele.min() if k else 0
+        diff = lengths - m
+        length_cost = np.where(diff >= 0, diff * min_ins, -diff * min_del)
+        alive = alive[length_cost <= max_distance]
+    else:
+        distances = np.zeros(len(lengths), dtype=dtype)
+    
+    block = ids[alive]
+    block_lengths = lengths[alive]
+    ins_steps = ins_steps[alive]
+    columns = np.arange(width + 1)
+    prev = ins_steps
+    
+    # Same row recurrence as dp_rows, with one DP row per candidate stacked into a 2-D block
+    for i in range(1, m + 1):
+        c = query_ids[i - 1]
+        row = np.empty_like(prev)
+        row[:, 0] = del_steps[i]
+        diagonal = prev[:, :-1] + sub[c][block]
+        row[:, 1:] = np.minimum(diagonal, prev[:, 1:] + dele[c])
+        prev = np.minimum.accumulate(row - ins_steps, axis=1) + ins_steps
+        
+        if max_distance is not None:
+            # Padding cells are not part of a candidate's row, so mask them out of the minimum
+            in_word = columns <= block_lengths[:, None]
+            keep = np.where(in_word, prev, max_distance + 1).min(axis=1) <= max_distance
+            if not keep.all():
+                prev, block, block_lengths, alive = prev[keep], block[keep], block_lengths[keep], alive[keep]
+                ins_steps = ins_steps[keep]
+    
+    final = prev[np.arange(len(alive)), block_lengths]
+    if max_distance is not None:
+        final = np.where(final <= max_distance, final, max_distance + 1)
+    distances[alive] = final
+    
+    order = np.argsort(distances, kind='stable')[:top_k]
+    if max_distance is not None:
+        order = order[distances[order] <= max_distance]
+    nearest = [(candidates[i], distances[i].item()) for i in order]
+    return distances, nearest
+
+class BKTree:
+    """Burkhard-Keller tree over a lexicon; needs a metric cost model (ins == del, sub <= ins + del)"""
+    
+    def __init__(self, words=(), costs=(1, 1, 1)):
+        sub_cost, ins_cost, del_cost = costs
+        if ins_cost != del_cost or sub_cost > ins_cost + del_cost or min(costs) <= 0:
+            raise ValueError(f"BKTree needs a metric cost model, got (sub, ins, del) = {costs}")
+        self.costs = costs
+        self.root = None  # [word, {distance: child node}]
+        self.size = 0
+        for word in words:
+            self.add(word)
+    
+    def distance(self, s1, s2):
+        return edit_distance(s1, s2, *self.costs, return_matrix=False)[0]
+    
+    def add(self, word):
+        if self.root is None:
+            self.root = [word, {}]
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            d = self.distance(word, node[0])
+            if d == 0:
+                return  # already present
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, {}]
+                self.size += 1
+                return
+            node = child
+    
+    def search(self, word, max_distance):
+        """All (word, distance) within max_distance, closest first"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = self.distance(word, node[0])
+            if d <= max_distance:
+                results.append((node[0], d))
+            # Triangle inequality: only children at distance d +/- max_distance can hold matches
+            for child_d, child in node[1].items():
+                if d - max_distance <= child_d <= d + max_distance:
+                    stack.append(child)
+        return sorted(results, key=lambda item: item[1])
+    
+    def nearest(self, word, k=1):
+        """The k closest (word, distance) pairs, shrinking the search radius as matches are found"""
+        best = []  # max-heap of (-distance, order, word)
+        order = 0
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = self.distance(word, node[0])
+            if len(best) < k:
+                heapq.heappush(best, (-d, -order, node[0]))
+            elif d < -best[0][0]:
+                heapq.heapreplace(best, (-d, -order, node[0]))
+            order += 1
+            radius = -best[0][0] if len(best) == k else float('inf')
+            # Push the most promising child last so it is visited first and shrinks the radius sooner
+            for child_d, child in sorted(node[1].items(), key=lambda item: -abs(item[0] - d)):
+                if d - radius <= child_d <= d + radius:
+                    stack.append(child)
+        return [(w, -neg_d) for neg_d, _, w in sorted(best, key=lambda item: (-item[0], -item[1]))]
 
-# Model A: Sub=1, Ins=1, Del=1
-print("\nModel A (Sub=1, Ins=1, Del=1):")
-dist_a, matrix_a = edit_distance(s1, s2, 1, 1, 1)
-alignment_a = get_alignment(s1, s2, matrix_a, 1, 1, 1)
+# Kinds of entries in TrieIndex.nearest's priority queue
+FINISHED, PENDING, VISITED = 0, 1, 2
 
-print(f"Minimum edit distance: {dist_a}")
-print("Edit sequence:")
-for i, op in enumerate(alignment_a, 1):
-    print(f"  {i}. {op}")
+class TrieNode:
+    __slots__ = ('children', 'word', 'min_rest', 'max_rest')
+    
+    def __init__(self):
+        self.children = {}
+        self.word = None
+        # Shortest and longest remaining suffix of any word below this node
+        self.min_rest = float('inf')
+        self.max_rest = 0
+
+class TrieIndex:
+    """Lexicon trie; each node extends its parent's DP column, so shared prefixes share work"""
+    
+    def __init__(self, words=(), costs=(1, 1, 1)):
+        self.costs = costs
+        self.root = TrieNode()
+        self.size = 0
+        for word in words:
+            self.add(word)
+    
+    def add(self, word):
+        node = self.root
+        for depth, c in enumerate(word):
+            node.min_rest = min(node.min_rest, len(word) - depth)
+            node.max_rest = max(node.max_rest, len(word) - depth)
+            node = node.children.setdefault(c, TrieNode())
+        node.min_rest = 0
+        if node.word is None:
+            node.word = word
+            self.size += 1
+    
+    def next_column(self, column, query, c):
+        """DP column for one more lexicon character c; column[i] = cost of query[:i] -> prefix"""
+        sub_cost, ins_cost, del_cost = self.costs
+        new = [column[0] + ins_cost]
+        for i in range(1, len(column)):
+            best = column[i - 1] + (0 if query[i - 1] == c else sub_cost)
+            if column[i] + ins_cost < best:
+                best = column[i] + ins_cost
+            if new[i - 1] + del_cost < best:
+                best = new[i - 1] + del_cost
+            new.append(best)
+        return new
+    
+    def lower_bound(self, node, column):
+        """No word below node can be closer than this: prefix cost plus the unavoidable length gap"""
+        sub_cost, ins_cost, del_cost = self.costs
+        m = len(column) - 1
+        bound = float('inf')
+        for i, cost in enumerate(column):
+            rest = m - i
+            if rest < node.min_rest:
+                cost += (node.min_rest - rest) * ins_cost
+            elif rest > node.max_rest:
+                cost += (rest - node.max_rest) * del_cost
+            if cost < bound:
+                bound = cost
+        return bound
+    
+    def first_column(self, query):
+        del_cost = self.costs[2]
+        return [i * del_cost for i in range(len(query) + 1)]
+    
+    def search(self, word, max_distance):
+        """All (lexicon word, distance) within max_distance, closest first"""
+        results = []
+        stack = [(self.root, self.first_column(word))]
+        while stack:
+            node, column = stack.pop()
+            if node.word is not None and column[-1] <= max_distance:
+                results.append((node.word, column[-1]))
+            for c, child in node.children.items():
+                new = self.next_column(column, word, c)
+                # Costs only grow down the trie, so once no word below can get under the limit the branch ends
+                if self.lower_bound(child, new) <= max_distance:
+                    stack.append((child, new))
+        return sorted(results, key=lambda item: item[1])
+    
+    def nearest(self, word, k=1):
+        """The k closest (word, distance) pairs by best-first search on each branch's lower bound"""
+        # Heap entries are (bound, order, kind, payload); bounds never decrease further
+        # down the trie, so the parent's bound is a valid bound for an unvisited child
+        results = []
+        order = 0
+        column = self.first_column(word)
+        heap = [(self.lower_bound(self.root, column), order, VISITED, (self.root, column))]
+        while heap and len(results) < k:
+            bound, _, kind, payload = heapq.heappop(heap)
+            order += 1
+            if kind == FINISHED:
+                # Nothing left in the heap can beat a finished word
+                results.append((payload, bound))
+            elif kind == PENDING:
+                # Compute the child's column only once it reaches the front of the queue
+                child, column, c = payload
+                new = self.next_column(column, word, c)
+                heapq.heappush(heap, (self.lower_bound(child, new), order, VISITED, (child, new)))
+            else:
+                node, column = payload
+                if node.word is not None:
+                    heapq.heappush(heap, (column[-1], order, FINISHED, node.word))
+                for c, child in node.children.items():
+                    order += 1
+                    heapq.heappush(heap, (bound, order, PENDING, (child, column, c)))
+        return results
 
-# Model B: Sub=2, Ins=1, Del=1  
-print("\nModel B (Sub=2, Ins=1, Del=1):")
-dist_b, matrix_b = edit_distance(s1, s2, 2, 1, 1)
-alignment_b = get_alignment(s1, s2, matrix_b, 2, 1, 1)
+# Per-process state for pairwise_edit_distance workers, set once by init_pairwise_worker
+PAIRWISE_WORKER = {}
 
-print(f"Minimum edit distance: {dist_b}")
-print("Edit sequence:")
-for i, op in enumerate(alignment_b, 1):
-    print(f"  {i}. {op}")
+def init_pairwise_worker(strings, costs, path, n, dtype):
+    """Pool initializer: keep the strings, their padded encoding and the shared result matrix"""
+    import numpy as np
+    PAIRWISE_WORKER.update(strings=strings, costs=costs, encoded=encode_strings(strings),
+                           out=np.memmap(path, dtype=dtype, mode='r+', shape=(n, n)))
 
-# Reflection
-print("\nReflection:")
-print("-" * 20)
+def pairwise_block(rows, cols, symmetric):
+    """Fill one block of the result matrix in place; nothing is sent back to the parent"""
+    strings = PAIRWISE_WORKER['strings']
+    codes, lengths = PAIRWISE_WORKER['encoded']
+    out = PAIRWISE_WORKER['out']
+    
+    for i in range(*rows):
+        # In the symmetric case only the part of the row above the diagonal is computed
+        start = max(cols[0], i + 1) if symmetric else cols[0]
+        end = cols[1]
+        if start >= end:
+            continue
+        distances, _ = edit_distance_many(strings[i], strings[start:end], PAIRWISE_WORKER['costs'],
+                                          top_k=0, encoded=(codes[start:end], lengths[start:end]))
+        out[i, start:end] = distances
+        if symmetric:
+            out[start:end, i] = distances
+    out.flush()
 
-same_distance = "Yes" if dist_a == dist_b else "No"
-print(f"1. Same distance? {same_distance} (A={dist_a}, B={dist_b})")
+def pairwise_edit_distance(strings, costs=(1, 1, 1), n_jobs=None, block_size=256, out=None):
+    """All-pairs distance matrix (int32, float64 for float costs), computed in blocks across a process pool
+    
+    Workers write straight into a memory-mapped result file: out if given (the returned
+    array is then that np.memmap), otherwise a temporary file copied into a plain array.
+    costs is a (sub, ins, del) tuple or a CostTable. With symmetric costs (ins == del and
+    a symmetric substitution matrix) only the upper triangle is computed.
+    """
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    import numpy as np
+    strings = list(strings)
+    n = len(strings)
+    if n == 0:
+        return np.zeros((0, 0), dtype=np.int32)
+    
+    table = as_cost_table(costs)
+    symmetric = table.symmetric
+    dtype = np.float64 if np.result_type(table.sub, table.ins, table.dele).kind == 'f' else np.int32
+    blocks = [((r, min(r + block_size, n)), (c, min(c + block_size, n)))
+              for r in range(0, n, block_size)
+              for c in range(r if symmetric else 0, n, block_size)]
+    
+    path = out
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.dist')
+        os.close(fd)
+    result = np.memmap(path, dtype=dtype, mode='w+', shape=(n, n))
+    
+    try:
+        n_jobs = n_jobs or os.cpu_count() or 1
+        if n_jobs == 1:
+            init_pairwise_worker(strings, costs, path, n, dtype)
+            for rows, cols in blocks:
+                pairwise_block(rows, cols, symmetric)
+            PAIRWISE_WORKER.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=init_pairwise_worker,
+                                     initargs=(strings, costs, path, n, dtype)) as pool:
+                list(pool.map(pairwise_block, *zip(*blocks), [symmetric] * len(blocks)))
+        
+        result.flush()
+        if out is not None:
+            return result
+        return np.array(result)
+    finally:
+        if out is None:
+            del result
+            os.remove(path)
 
-print("2. Most useful operations: Substitutions and insertions")
-print("   - Many character mismatches between the words")  
-print("   - Saturday is longer, requiring insertions")
+def sunday_saturday_demo():
+    """Q4: Sunday → Saturday under both cost models, with the reflection"""
+    print("Q4: Edit Distance - Sunday → Saturday")
+    print("=" * 40)
+    
+    s1, s2 = "Sunday", "Saturday"
+    
+    # Model A: Sub=1, Ins=1, Del=1
+    print("\nModel A (Sub=1, Ins=1, Del=1):")
+    dist_a, matrix_a = edit_distance(s1, s2, 1, 1, 1)
+    alignment_a = get_alignment(s1, s2, matrix_a, 1, 1, 1)
+    
+    print(f"Minimum edit distance: {dist_a}")
+    print("Edit sequence:")
+    for i, op in enumerate(alignment_a, 1):
+        print(f"  {i}. {op}")
+    
+    # Model B: Sub=2, Ins=1, Del=1  
+    print("\nModel B (Sub=2, Ins=1, Del=1):")
+    dist_b, matrix_b = edit_distance(s1, s2, 2, 1, 1)
+    alignment_b = get_alignment(s1, s2, matrix_b, 2, 1, 1)
+    
+    print(f"Minimum edit distance: {dist_b}")
+    print("Edit sequence:")
+    for i, op in enumerate(alignment_b, 1):
+        print(f"  {i}. {op}")
+    
+    # Reflection
+    print("\nReflection:")
+    print("-" * 20)
+    
+    same_distance = "Yes" if dist_a == dist_b else "No"
+    print(f"1. Same distance? {same_distance} (A={dist_a}, B={dist_b})")
+    
+    print("2. Most useful operations: Substitutions and insertions")
+    print("   - Many character mismatches between the words")  
+    print("   - Saturday is longer, requiring insertions")
+    
+    print("3. Application effects:")
+    print("   - Spell check: Model A better (substitutions common in typos)")
+    print("   - DNA alignment: Model B better (insertions/deletions more natural)")
 
-print("3. Application effects:")
-print("   - Spell check: Model A better (substitutions common in typos)")
-print("   - DNA alignment: Model B better (insertions/deletions more natural)")
\ No newline at end of file
+if __name__ == "__main__":
+    sunday_saturday_demo()
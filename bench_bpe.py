@@ -0,0 +1,130 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from Q3 import BPELearner, AdvancedBPE, count_words
+
+from bench_utils import compare, git_commit
+
+# Learner configurations to benchmark: name -> (class, constructor kwargs)
+ENGINES = {
+    "BPELearner": (BPELearner, {}),
+    "AdvancedBPE": (AdvancedBPE, {}),
+    "AdvancedBPE-bytes": (AdvancedBPE, {"byte_level": True}),
+}
+
+# Metrics where a higher number is better; used by --compare
+THROUGHPUT_METRICS = ("merges_per_sec", "words_per_sec", "tokens_per_sec")
+
+
+def zipf_corpus(num_tokens, vocab_size, seed=0, exponent=1.1, line_length=20):
+    """Synthetic corpus lines whose word frequencies follow a Zipf law"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 12)))
+             for _ in range(vocab_size)]
+    weights = [1 / rank ** exponent for rank in range(1, vocab_size + 1)]
+
+    tokens = rng.choices(words, weights=weights, k=num_tokens)
+    return [' '.join(tokens[i:i + line_length]) for i in range(0, num_tokens, line_length)]
+
+
+def bench_engine(cls, kwargs, lines, num_merges, repeat=3, measure_memory=True):
+    """Time training and encoding for one learner configuration (best of repeat runs)"""
+    result = {}
+
+    # The learners print every merge; keep that out of the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        elapsed = float("inf")
+        for _ in range(repeat):
+            model = cls(**kwargs)
+            word_freqs = count_words(lines, model.byte_level)
+            start = time.perf_counter()
+            model.train_counts(word_freqs, num_merges)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        result["train_sec"] = elapsed
+        result["merges"] = len(model.merges)
+        result["merges_per_sec"] = len(model.merges) / elapsed if elapsed else None
+
+        num_words = sum(len(line.split()) for line in lines)
+        elapsed = float("inf")
+        for _ in range(repeat):
+            # Cold cache each time, so every run pays for the same segmentations
+            model.cache.clear()
+            start = time.perf_counter()
+            ids, offsets = model.encode_batch(lines)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        result["encode_sec"] = elapsed
+        result["words_per_sec"] = num_words / elapsed if elapsed else None
+        result["tokens_per_sec"] = len(ids) / elapsed if elapsed else None
+        result["tokens_per_word"] = len(ids) / num_words if num_words else None
+        result["cache"] = model.cache.stats()
+
+        # Separate traced run: tracemalloc slows allocation, so it never overlaps the timings
+        if measure_memory:
+            tracemalloc.start()
+            model = cls(**kwargs)
+            model.train_counts(count_words(lines, model.byte_level), num_merges)
+            model.encode_batch(lines)
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return result
+
+
+def run(args):
+    lines = zipf_corpus(args.tokens, args.vocab_size, args.seed)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"tokens": args.tokens, "vocab_size": args.vocab_size,
+                   "merges": args.merges, "seed": args.seed, "repeat": args.repeat},
+        "results": {},
+    }
+    for name in args.engines:
+        cls, kwargs = ENGINES[name]
+        report["results"][name] = bench_engine(cls, kwargs, lines, args.merges, args.repeat, not args.no_memory)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BPE training and encoding on a synthetic Zipfian corpus")
+    parser.add_argument("--tokens", type=int, default=200000, help="corpus size in word tokens")
+    parser.add_argument("--vocab-size", type=int, default=20000, help="number of distinct words")
+    parser.add_argument("--merges", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per measurement; the fastest is kept")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed fractional throughput drop before --compare fails")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, THROUGHPUT_METRICS)
+        if regressions:
+            print(f"Throughput regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import time
+
+from Q4 import BKTree, TrieIndex, edit_distance
+
+from bench_utils import git_commit
+
+
+def random_lexicon(size, seed=0):
+    rng = random.Random(seed)
+    words = {''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12)))
+             for _ in range(size)}
+    return sorted(words)
+
+
+def misspell(word, rng, edits=1):
+    """Apply random single-character insertions, deletions or substitutions"""
+    chars = list(word)
+    for _ in range(edits):
+        op = rng.choice("isd") if chars else "i"
+        pos = rng.randrange(len(chars) + (op == "i"))
+        if op == "i":
+            chars.insert(pos, rng.choice(string.ascii_lowercase))
+        elif op == "s":
+            chars[pos] = rng.choice(string.ascii_lowercase)
+        else:
+            del chars[pos]
+    return ''.join(chars)
+
+
+def brute_force_search(lexicon, word, max_distance, costs):
+    results = []
+    for candidate in lexicon:
+        d = edit_distance(word, candidate, *costs, max_distance=max_distance)[0]
+        if d <= max_distance:
+            results.append((candidate, d))
+    return sorted(results, key=lambda item: item[1])
+
+
+def brute_force_nearest(lexicon, word, k, costs):
+    scored = [(candidate, edit_distance(word, candidate, *costs, return_matrix=False)[0])
+              for candidate in lexicon]
+    return sorted(scored, key=lambda item: item[1])[:k]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    return time.perf_counter() - start, results
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    lexicon = random_lexicon(args.lexicon_size, args.seed)
+    queries = [misspell(rng.choice(lexicon), rng, rng.randint(1, args.max_distance))
+               for _ in range(args.queries)]
+    costs = tuple(args.costs)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"lexicon_size": len(lexicon), "queries": args.queries, "max_distance": args.max_distance,
+                   "k": args.k, "costs": list(costs), "seed": args.seed},
+        "build_sec": {},
+        "search_sec": {},
+        "nearest_sec": {},
+    }
+
+    indexes = {}
+    start = time.perf_counter()
+    indexes["trie"] = TrieIndex(lexicon, costs)
+    report["build_sec"]["trie"] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        indexes["bktree"] = BKTree(lexicon, costs)
+        report["build_sec"]["bktree"] = time.perf_counter() - start
+    except ValueError:
+        pass  # BK-tree needs a metric; non-metric cost models only get the trie
+
+    elapsed, expected = timed(lambda q: brute_force_search(lexicon, q, args.max_distance, costs), queries)
+    report["search_sec"]["brute_force"] = elapsed
+    for name, index in indexes.items():
+        elapsed, found = timed(lambda q: index.search(q, args.max_distance), queries)
+        report["search_sec"][name] = elapsed
+        # Same matches as the scan (order among equal distances may differ)
+        assert [sorted(r) for r in found] == [sorted(r) for r in expected], f"{name} search disagrees with scan"
+
+    elapsed, expected = timed(lambda q: brute_force_nearest(lexicon, q, args.k, costs), queries)
+    report["nearest_sec"]["brute_force"] = elapsed
+    for name, index in indexes.items():
+        elapsed, found = timed(lambda q: index.nearest(q, args.k), queries)
+        report["nearest_sec"][name] = elapsed
+        assert [[d for _, d in r] for r in found] == [[d for _, d in r] for r in expected], \
+            f"{name} nearest disagrees with scan"
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BK-tree and trie lexicon lookups against a brute-force scan")
+    parser.add_argument("--lexicon-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-distance", type=int, default=2)
+    parser.add_argument("--k", type=int, default=1, help="neighbours for the nearest() benchmark")
+    parser.add_argument("--costs", type=int, nargs=3, default=[1, 1, 1], metavar=("SUB", "INS", "DEL"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    text = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+
+from Q1 import PATTERNS, PatternStats, extract_all, find_matches
+
+from bench_utils import compare, git_commit
+
+# Metrics where a higher number is better; used by --compare
+THROUGHPUT_METRICS = ("chars_per_sec",)
+
+
+def random_word(rng, capital=False):
+    word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+    return word.capitalize() if capital else word
+
+
+def random_number(rng):
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"{rng.randint(0, 10 ** 7):,}"
+    if kind == 1:
+        return f"{rng.uniform(-1000, 1000):.2f}"
+    if kind == 2:
+        return f"{rng.uniform(1, 10):.1f}e{rng.choice('+-')}{rng.randint(1, 20)}"
+    if kind == 3:
+        return f"{rng.choice('+-')}{rng.randint(1, 999)}"
+    return str(rng.randint(0, 100))
+
+
+# Generators for the things each pattern looks for, mixed into the corpus lines
+FRAGMENTS = (
+    lambda rng: f"{rng.randint(10000, 99999)}" + rng.choice(["", f"-{rng.randint(1000, 9999)}", f" {rng.randint(1000, 9999)}"]),
+    random_number,
+    lambda rng: rng.choice(["email", "e-mail", "e mail", "E-Mail", "EMAIL"]),
+    lambda rng: "g" + "o" * rng.randint(1, 6) + rng.choice(["", "!", "?", ".", ","]),
+    lambda rng: rng.choice(["don't", "state-of-the-art", "o'clock", "well-known"]),
+)
+
+
+def synthetic_corpus(num_docs, lines_per_doc=20, words_per_line=12, seed=0, adversarial=0.0):
+    """Documents of mixed prose, ZIP codes, numbers, email spellings and interjections
+
+    About one line in five is a question. adversarial is the share of lines that also carry a
+    long hyphen/apostrophe run, the kind of token the original non-capital pattern chokes on.
+    """
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(num_docs):
+        lines = []
+        for _ in range(lines_per_doc):
+            words = []
+            for position in range(words_per_line):
+                if rng.random() < 0.25:
+                    words.append(rng.choice(FRAGMENTS)(rng))
+                else:
+                    words.append(random_word(rng, capital=position == 0 or rng.random() < 0.1))
+            if rng.random() < adversarial:
+                words.append("a" + rng.choice("-'") * rng.randint(10, 18) + "!")
+            line = ' '.join(words)
+            lines.append(line + rng.choice(['?', '?"', "?')", '.', '.', '.', '!', '']))
+        docs.append('\n'.join(lines))
+    return docs
+
+
+def with_rates(snapshot):
+    """Add throughput, time per call and share of total time to a PatternStats snapshot"""
+    total_ns = sum(counter["time_ns"] for counter in snapshot.values()) or 1
+    results = {}
+    for name, counter in snapshot.items():
+        seconds = counter["time_ns"] / 1e9
+        results[name] = dict(counter,
+                             chars_per_sec=counter["chars"] / seconds if seconds else None,
+                             us_per_call=counter["time_ns"] / 1e3 / counter["calls"] if counter["calls"] else None,
+                             time_share=counter["time_ns"] / total_ns)
+    return results
+
+
+def run(args):
+    docs = synthetic_corpus(args.docs, args.lines, seed=args.seed, adversarial=args.adversarial)
+
+    # Each pattern on its own, so the time splits cleanly per pattern
+    per_pattern = PatternStats()
+    for _ in range(args.repeat):
+        for doc in docs:
+            for name in PATTERNS:
+                find_matches(name, doc, per_pattern)
+
+    # The production path, as callers use it
+    combined = PatternStats()
+    for _ in range(args.repeat):
+        for doc in docs:
+            extract_all(doc, combined)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"docs": args.docs, "lines": args.lines, "seed": args.seed, "repeat": args.repeat,
+                   "adversarial": args.adversarial, "corpus_chars": sum(len(doc) for doc in docs)},
+        "results": with_rates(per_pattern.snapshot()),
+        "extract_all": with_rates(combined.snapshot()),
+    }
+
+
+def print_table(results, title):
+    print(title, file=sys.stderr)
+    print(f"  {'pattern':40} {'calls':>7} {'matches':>9} {'Mchar/s':>9} {'us/call':>9} {'share':>6}", file=sys.stderr)
+    for name, result in sorted(results.items(), key=lambda item: -item[1]["time_ns"]):
+        rate = (result["chars_per_sec"] or 0) / 1e6
+        print(f"  {name:40} {result['calls']:7} {result['matches']:9} {rate:9.1f} "
+              f"{result['us_per_call'] or 0:9.1f} {result['time_share']:6.1%}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the Q1 regex patterns on a synthetic corpus")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=20, help="lines per document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus")
+    parser.add_argument("--adversarial", type=float, default=0.0,
+                        help="share of lines carrying a long hyphen/apostrophe run")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed fractional throughput drop before --compare fails")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_table(report["results"], "Per pattern (separate scans):")
+    print_table(report["extract_all"], "extract_all:")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, THROUGHPUT_METRICS)
+        if regressions:
+            print(f"Throughput regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
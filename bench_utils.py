@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+# Helpers shared by the benchmark scripts. Kept free of the Q* imports, so a script
+# only pays for the modules it actually exercises
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, tolerance, metrics):
+    """Print per-metric ratios against a baseline report; return names of regressed metrics
+
+    metrics are the higher-is-better fields of each result, compared as new / old.
+    """
+    regressions = []
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        for metric in metrics:
+            if not result.get(metric) or not old.get(metric):
+                continue
+            ratio = result[metric] / old[metric]
+            flag = ""
+            if ratio < 1 - tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(f"{name:18} {metric:15} {old[metric]:12.1f} -> {result[metric]:12.1f}  x{ratio:.2f}{flag}",
+                  file=sys.stderr)
+    return regressions
@@ -0,0 +1,133 @@
+import argparse
+import random
+import sys
+
+from Q3 import PairMergeEngine, count_words, encode_with_ranks, merge_ranks
+
+# Small alphabets give many pairs tied at the same count, which is where the heap's
+# tie-break has to agree with the reference
+ALPHABETS = ("ab", "abc", "abcdefgh")
+
+
+def random_lines(rng, alphabet, max_words=40, max_length=8):
+    words = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, max_length)))
+             for _ in range(rng.randint(1, max_words))]
+    return [' '.join(words)]
+
+
+def reference_merges(word_freqs, num_merges):
+    """Rebuild every pair count from scratch each step; max() keeps the first-seen pair among ties"""
+    words = [(tuple(word), freq) for word, freq in word_freqs.items()]
+    if words and isinstance(words[0][0][0], int):
+        # Byte-level words iterate as ints; tokens are bytes
+        words = [(tuple(bytes([byte]) for byte in word), freq) for word, freq in words]
+    merges = []
+    for _ in range(num_merges):
+        pair_counts = {}
+        for word, freq in words:
+            for pair in zip(word, word[1:]):
+                pair_counts[pair] = pair_counts.get(pair, 0) + freq
+        if not pair_counts:
+            break
+        best = max(pair_counts, key=pair_counts.get)
+        merges.append((best, pair_counts[best]))
+
+        merged_words = []
+        for word, freq in words:
+            merged = []
+            j = 0
+            while j < len(word):
+                if j < len(word) - 1 and (word[j], word[j + 1]) == best:
+                    merged.append(word[j] + word[j + 1])
+                    j += 2
+                else:
+                    merged.append(word[j])
+                    j += 1
+            merged_words.append((tuple(merged), freq))
+        words = merged_words
+    return merges
+
+
+def engine_merges(word_freqs, num_merges, byte_level=False, workers=None):
+    engine = PairMergeEngine(word_freqs, workers, byte_level)
+    merges = []
+    for _ in range(num_merges):
+        best = engine.best_pair()
+        if best is None:
+            break
+        merges.append(best)
+        engine.merge(best[0])
+    return merges
+
+
+def check_engine(num_corpora, seed=0, max_merges=60):
+    """PairMergeEngine against the rebuild-every-step reference on random corpora"""
+    rng = random.Random(seed)
+    mismatches = []
+    for trial in range(num_corpora):
+        byte_level = trial % 3 == 0
+        lines = random_lines(rng, rng.choice(ALPHABETS))
+        word_freqs = count_words(lines, byte_level)
+        num_merges = rng.randint(1, max_merges)
+        # Every tenth corpus also goes through the sharded initial count
+        workers = 2 if trial % 10 == 0 else None
+        if engine_merges(word_freqs, num_merges, byte_level, workers) != reference_merges(word_freqs, num_merges):
+            mismatches.append({"lines": lines, "merges": num_merges, "byte_level": byte_level})
+    return mismatches
+
+
+def replay_merges(symbols, merges):
+    """Apply every merge in learned order, each one left to right over the whole word"""
+    symbols = list(symbols)
+    for first, second in merges:
+        merged = []
+        j = 0
+        while j < len(symbols):
+            if j < len(symbols) - 1 and symbols[j] == first and symbols[j + 1] == second:
+                merged.append(first + second)
+                j += 2
+            else:
+                merged.append(symbols[j])
+                j += 1
+        symbols = merged
+    return symbols
+
+
+def check_encoder(num_corpora, seed=0, words_per_corpus=50, max_merges=60):
+    """encode_with_ranks against replaying the merges, with merges learned on random corpora
+
+    Test words come from a wider alphabet than the corpus, so some characters are unseen.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(num_corpora):
+        alphabet = rng.choice(ALPHABETS)
+        word_freqs = count_words(random_lines(rng, alphabet))
+        merges = [pair for pair, _ in engine_merges(word_freqs, rng.randint(1, max_merges))]
+        ranks = merge_ranks(merges)
+        for _ in range(words_per_corpus):
+            word = ''.join(rng.choice(alphabet + "xy") for _ in range(rng.randint(0, 12))) + '_'
+            if encode_with_ranks(word, ranks) != replay_merges(word, merges):
+                mismatches.append({"word": word, "merges": merges})
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the BPE training engine and rank encoder "
+                                                 "against naive references")
+    parser.add_argument("--corpora", type=int, default=300, help="random corpora for each check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name, check in (("engine", check_engine), ("encoder", check_encoder)):
+        mismatches = check(args.corpora, args.seed)
+        print(f"{name}: {args.corpora} corpora, {len(mismatches)} mismatches", file=sys.stderr)
+        for mismatch in mismatches[:5]:
+            print(f"  {mismatch}", file=sys.stderr)
+        failures += len(mismatches)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
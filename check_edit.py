@@ -0,0 +1,164 @@
+import argparse
+import math
+import random
+import sys
+
+from Q4 import (CostTable, edit_distance, edit_distance_many, fill_dp_matrix, get_alignment, hirschberg_alignment,
+                pairwise_edit_distance)
+
+ALPHABET = "abcd"
+# Non-dyadic fractions, so float round-off shows up wherever exact comparison is assumed
+FRACTIONS = (0.1, 0.3, 0.5, 0.7, 1.1, 1.3)
+
+
+def random_costs(rng, kind, shape):
+    """Nested lists of int, float or (for "mixed") either, per cell"""
+    def cost():
+        if kind == "int" or (kind == "mixed" and rng.random() < 0.5):
+            return rng.randint(1, 3)
+        return rng.choice(FRACTIONS)
+    if len(shape) == 1:
+        return [cost() for _ in range(shape[0])]
+    return [[cost() for _ in range(shape[1])] for _ in range(shape[0])]
+
+
+def random_table(rng):
+    """A CostTable over part of ALPHABET (the rest uses the scalar defaults), mixing int and float parts"""
+    alphabet = ALPHABET[:rng.randint(1, len(ALPHABET) - 1)]
+    k = len(alphabet)
+    kinds = [rng.choice(["int", "float", "mixed"]) for _ in range(3)]
+    defaults = [rng.choice([1, 2, 0.5, 0.7]) for _ in range(3)]
+    return CostTable(alphabet, sub=random_costs(rng, kinds[0], (k, k)), ins=random_costs(rng, kinds[1], (k,)),
+                     dele=random_costs(rng, kinds[2], (k,)), sub_cost=defaults[0], ins_cost=defaults[1],
+                     del_cost=defaults[2])
+
+
+def reference_distance(s1, s2, table):
+    """Textbook full-matrix DP on Python numbers, reading each cost straight from the table"""
+    def slot(c):
+        return table.index.get(c, len(table.alphabet))
+    prev = [0]
+    for c in s2:
+        prev.append(prev[-1] + table.ins[slot(c)].item())
+    for c1 in s1:
+        cur = [prev[0] + table.dele[slot(c1)].item()]
+        for j, c2 in enumerate(s2, 1):
+            cur.append(min(prev[j - 1] + (0 if c1 == c2 else table.sub[slot(c1), slot(c2)].item()),
+                           prev[j] + table.dele[slot(c1)].item(),
+                           cur[j - 1] + table.ins[slot(c2)].item()))
+        prev = cur
+    return prev[-1]
+
+
+def close(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def random_string(rng, max_length):
+    return ''.join(rng.choice(ALPHABET + "x") for _ in range(rng.randint(0, max_length)))
+
+
+def check_distances(num_cases, seed=0, max_length=12):
+    """Every distance path against the reference, for random per-character and scalar costs"""
+    rng = random.Random(seed)
+    mismatches = []
+    for case in range(num_cases):
+        if case % 2:
+            table = random_table(rng)
+            scalar = ()
+            options = {"table": table}
+        else:
+            scalar = tuple(rng.choice([1, 2, 0.5, 0.7, 1.1]) for _ in range(3))
+            table = CostTable(sub_cost=scalar[0], ins_cost=scalar[1], del_cost=scalar[2])
+            options = {}
+        # Every fourth case is long enough to leave the pure-Python kernel for the NumPy rows
+        length = 60 if case % 4 == 0 else max_length
+        s1, s2 = random_string(rng, length), random_string(rng, length)
+        expected = reference_distance(s1, s2, table)
+
+        got = {
+            "matrix": edit_distance(s1, s2, *scalar, **options)[0],
+            "distance_only": edit_distance(s1, s2, *scalar, return_matrix=False, **options)[0],
+            # A hair over the expected distance, since the band sums costs in a different order
+            "banded": edit_distance(s1, s2, *scalar, max_distance=expected + 1e-9, **options)[0],
+            "many": edit_distance_many(s1, [s2, s1], options.get("table", scalar))[0][0],
+            "pairwise": pairwise_edit_distance([s1, s2], options.get("table", scalar), n_jobs=1)[0, 1],
+        }
+        for path, value in got.items():
+            if not close(float(value), expected):
+                mismatches.append({"path": path, "s1": s1, "s2": s2, "costs": scalar or "table",
+                                   "expected": expected, "got": float(value)})
+    return mismatches
+
+
+def alignment_cost(s1, s2, operations, table):
+    """Replay an edit sequence on s1, returning (resulting string, summed cost)"""
+    def slot(c):
+        return table.index.get(c, len(table.alphabet))
+    out, i, cost = [], 0, 0
+    for op in operations:
+        kind, chars = op.split(" ", 1)
+        chars = chars.split("'")[1::2]
+        if kind == "Match":
+            out.append(s1[i])
+            i += 1
+        elif kind == "Substitute":
+            cost += table.sub[slot(s1[i]), slot(chars[1])].item()
+            out.append(chars[1])
+            i += 1
+        elif kind == "Insert":
+            cost += table.ins[slot(chars[0])].item()
+            out.append(chars[0])
+        else:
+            cost += table.dele[slot(s1[i])].item()
+            i += 1
+    return ''.join(out) + s1[i:], cost
+
+
+def check_alignments(num_cases, seed=0, max_length=12):
+    """get_alignment and hirschberg_alignment must turn s1 into s2 at exactly the reference cost
+
+    Non-dyadic costs make the DP rows round differently from the backtrack's sums, which is
+    where an exact comparison would stall the walk.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for case in range(num_cases):
+        if case % 2:
+            table = random_table(rng)
+            scalar = ()
+        else:
+            scalar = tuple(rng.choice(FRACTIONS) for _ in range(3))
+            table = CostTable(sub_cost=scalar[0], ins_cost=scalar[1], del_cost=scalar[2])
+        s1, s2 = random_string(rng, max_length), random_string(rng, max_length)
+        expected = reference_distance(s1, s2, table)
+        options = {"table": table} if not scalar else {}
+
+        dp = fill_dp_matrix(s1, s2, *scalar, **options)
+        for path, operations in (("backtrack", get_alignment(s1, s2, dp, *scalar, **options)),
+                                 ("hirschberg", hirschberg_alignment(s1, s2, *scalar, **options))):
+            result, cost = alignment_cost(s1, s2, operations, table)
+            if result != s2 or not close(cost, expected):
+                mismatches.append({"path": path, "s1": s1, "s2": s2, "costs": scalar or "table",
+                                   "expected": expected, "got": cost})
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the edit distance kernels and alignments "
+                                                 "against a reference DP")
+    parser.add_argument("--cases", type=int, default=400, help="random string pairs and cost models")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for name, check in (("distances", check_distances), ("alignments", check_alignments)):
+        mismatches = check(args.cases, args.seed)
+        print(f"{name}: {args.cases} cases, {len(mismatches)} mismatches", file=sys.stderr)
+        for mismatch in mismatches[:5]:
+            print(f"  {mismatch}", file=sys.stderr)
+        failures += len(mismatches)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
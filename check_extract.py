@@ -0,0 +1,58 @@
+import argparse
+import random
+import sys
+
+from Q1 import MIN_OVERLAP, PATTERNS, extract_all, extract_all_parallel
+
+# Characters and fragments the random texts are built from; the fragments include matches
+# that run past a newline ("12345\n6789", "e\nmail"), which are the ones a chunk cut can split
+ALPHABET = list("0123456789,.-+eEgGoOmMaAiIlLxZ ?!\"')]\n\t\r") + ["–"]
+FRAGMENTS = ["email", "e-mail", "E mail", "e\nmail", "e–mail", "go", "Gooo!", "goo?", "12345", "90210-1234",
+             "78701 5678", "12345\n6789", "12345\n67890", "1,234,567.89", "-3.14e+5", "2.5e-10", "don't",
+             "state-of-the-art", "?\"", "?')]", "\n", "\n\n", "1,234\n"]
+
+
+def random_text(rng, max_pieces=600):
+    return "".join(rng.choice(ALPHABET) if rng.random() < 0.6 else rng.choice(FRAGMENTS)
+                   for _ in range(rng.randint(0, max_pieces)))
+
+
+def check_parallel(num_texts, seed=0, pool_every=100):
+    """extract_all_parallel against extract_all on random texts, chunk sizes and overlaps
+
+    Tiny chunks put a cut on nearly every line. Overlaps start at MIN_OVERLAP, the smallest
+    allowed. extract_all itself is checked against each pattern's re.findall. Every
+    pool_every-th text also goes through a real process pool.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for trial in range(num_texts):
+        text = random_text(rng)
+        expected = extract_all(text)
+        for name, pattern in PATTERNS.items():
+            if [match for match, _ in expected[name]] != pattern.findall(text):
+                mismatches.append({"check": "findall", "pattern": name, "text": text})
+
+        chunk_size = rng.choice([1, 5, 20, 100])
+        overlap = rng.choice([MIN_OVERLAP, MIN_OVERLAP + 1, 16, 64])
+        n_jobs = 3 if trial % pool_every == 0 else 1
+        if extract_all_parallel(text, n_jobs, chunk_size, overlap) != expected:
+            mismatches.append({"check": "parallel", "text": text, "chunk_size": chunk_size, "overlap": overlap})
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check chunked parallel extraction against extract_all")
+    parser.add_argument("--texts", type=int, default=1500, help="random texts to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mismatches = check_parallel(args.texts, args.seed)
+    print(f"parallel: {args.texts} texts, {len(mismatches)} mismatches", file=sys.stderr)
+    for mismatch in mismatches[:5]:
+        print(f"  {mismatch}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import argparse
+import functools
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+from Q1 import ORIGINAL_PATTERNS, PATTERNS
+
+from bench_utils import git_commit
+
+# Adversarial input families: name -> function(n) building a string that grows with n.
+# Long runs of the characters the patterns' quantifiers overlap on, ending in a character
+# that makes the final check (\b, $) fail so the engine has to backtrack
+ATTACKS = {
+    "hyphen_run": lambda n: "a" + "-" * n + "!",
+    "apostrophe_run": lambda n: "a" + "'" * n + "!",
+    "hyphen_apostrophe": lambda n: "a" + "-'" * n + "!",
+    "word_chain": lambda n: "a" + "-a" * n + "-!",
+    "question_tail": lambda n: "?" + " )" * n + "x",
+    "question_marks": lambda n: "?" * n + "x",
+    "long_go": lambda n: "go" + "o" * n + "x",
+    "digit_groups": lambda n: "1" + ",123" * n + ",12x",
+    "digit_run": lambda n: "9" * n + "-",
+}
+
+# Characters and fragments the random equivalence texts are built from
+FUZZ_ALPHABET = list("0123456789,.-+eEgGoOmMaAiIlLxZ ?!\"')]\n\t\r") + ["–"]
+FUZZ_TOKENS = ["email", "e-mail", "E mail", "e\nmail", "e–mail", "go", "Gooo!", "goo?", "12345", "90210-1234",
+               "78701 5678", "12345\n6789", "1,234,567.89", "-3.14e+5", "2.5e-10", "don't", "state-of-the-art",
+               "a--b", "x''y", "?\"", "?')]", "\n\n"]
+
+# Growth exponents above this count as super-linear (1 = linear, 2 = quadratic)
+SUPERLINEAR_EXPONENT = 1.5
+
+
+def best_time(scan, text, repeat):
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan(text)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+
+def time_growth(scan, make_text, budget, max_length, repeat=3):
+    """(length, seconds) points for growing inputs, stopping once one takes longer than budget
+
+    Sizes grow by 25% a step, so an exponential blow-up overshoots the budget by a bounded
+    factor instead of hanging the harness.
+    """
+    points = []
+    n = 4
+    while True:
+        text = make_text(n)
+        elapsed = best_time(scan, text, repeat)
+        points.append((len(text), elapsed))
+        if elapsed > budget or len(text) >= max_length:
+            return points
+        n = max(n + 1, int(n * 1.25))
+
+
+def growth_exponent(points, floor=1e-4, span=8):
+    """Least-squares slope of log(time) against log(length) over the largest inputs
+
+    Only points within a factor span of the longest input and above the timer-noise floor count.
+    """
+    longest = points[-1][0]
+    usable = [(math.log(length), math.log(seconds)) for length, seconds in points
+              if seconds >= floor and length * span >= longest]
+    if len(usable) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in usable) / len(usable)
+    mean_y = sum(y for _, y in usable) / len(usable)
+    spread = sum((x - mean_x) ** 2 for x, _ in usable)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in usable) / spread
+
+
+def analyze(patterns, budget, max_length, repeat, per_line=()):
+    """Growth of match time with input length, for every pattern against every attack family
+
+    Patterns named in per_line are timed the way the homework applies them, re.match on each
+    line (see line_spans); the rest are timed with findall over the whole text.
+    """
+    report = {}
+    for name, pattern in patterns.items():
+        report[name] = {}
+        scan = functools.partial(line_spans, pattern) if name in per_line else pattern.findall
+        for attack, make_text in ATTACKS.items():
+            points = time_growth(scan, make_text, budget, max_length, repeat)
+            report[name][attack] = {"max_length": points[-1][0], "seconds": points[-1][1],
+                                    "exponent": growth_exponent(points)}
+    return report
+
+
+def superlinear(report):
+    return [f"{name}/{attack}" for name, attacks in report.items()
+            for attack, result in attacks.items() if result["exponent"] > SUPERLINEAR_EXPONENT]
+
+
+def random_text(rng, max_pieces=40):
+    return "".join(rng.choice(FUZZ_ALPHABET) if rng.random() < 0.6 else rng.choice(FUZZ_TOKENS)
+                   for _ in range(rng.randint(0, max_pieces)))
+
+
+def line_spans(pattern, text):
+    """Spans of the lines of text that pattern matches with re.match, as the homework applies it"""
+    spans = []
+    start = 0
+    for line in text.split('\n'):
+        if pattern.match(line):
+            spans.append((start, start + len(line)))
+        start += len(line) + 1
+    return spans
+
+
+def check_equivalence(num_texts, seed=0, attack_sizes=range(0, 12)):
+    """Compare PATTERNS against ORIGINAL_PATTERNS (spans of every match) on random and attack texts
+
+    The original question-line pattern is matched line by line; the registry's is one multiline
+    scan, whose matches should be exactly the lines the original accepts.
+    """
+    rng = random.Random(seed)
+    texts = [random_text(rng) for _ in range(num_texts)]
+    # Small attack inputs only: the originals are exponential on some of them
+    texts += [make_text(n) for make_text in ATTACKS.values() for n in attack_sizes]
+
+    mismatches = []
+    for name, pattern in PATTERNS.items():
+        original = ORIGINAL_PATTERNS[name]
+        if pattern is original:
+            continue
+        for text in texts:
+            if name == "question_lines":
+                expected = line_spans(original, text)
+            else:
+                expected = [match.span() for match in original.finditer(text)]
+            if [match.span() for match in pattern.finditer(text)] != expected:
+                mismatches.append({"pattern": name, "text": text})
+    return {"texts": len(texts), "mismatches": mismatches}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the Q1 patterns for super-linear backtracking "
+                                                 "and the linear-time rewrites for equivalence")
+    parser.add_argument("--budget", type=float, default=0.05,
+                        help="seconds per scan before an attack stops growing")
+    parser.add_argument("--max-length", type=int, default=1 << 16, help="largest attack input in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per input; the fastest is kept")
+    parser.add_argument("--fuzz", type=int, default=20000, help="random texts for the equivalence check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--original", action="store_true", help="also time the original patterns")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {"budget": args.budget, "max_length": args.max_length, "fuzz": args.fuzz, "seed": args.seed},
+        "growth": {"registry": analyze(PATTERNS, args.budget, args.max_length, args.repeat)},
+        "equivalence": check_equivalence(args.fuzz, args.seed),
+    }
+    if args.original:
+        # The original question-line pattern is only ever matched per line, so time it that way
+        report["growth"]["original"] = analyze(ORIGINAL_PATTERNS, args.budget, args.max_length, args.repeat,
+                                               per_line=("question_lines",))
+
+    for group, growth in report["growth"].items():
+        for item in superlinear(growth):
+            print(f"{group:8} super-linear: {item}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failures = superlinear(report["growth"]["registry"])
+    if report["equivalence"]["mismatches"]:
+        print(f"{len(report['equivalence']['mismatches'])} rewrite mismatches", file=sys.stderr)
+        failures.append("equivalence")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())